@@ -1,17 +1,19 @@
 import streamlit as st
 from datetime import datetime
 import os
-import feedparser
-import requests
-import urllib.parse
-import pandas as pd
-import pdfkit
-import plotly.express as px
-import schedule
-import threading
 import time
 from dotenv import load_dotenv
-from notion_client import Client
+import cache_rapports
+import metrics
+import pdf_worker
+import scheduler
+from quota import ErreurSerpAPI, etat_serpapi
+from fetch_engine import DELAI_GLOBAL
+from statistiques import figures_courantes
+from utils import (SECTEURS, PAYS, ENTREPRISES, search_arxiv, get_google_news, enregistrer_dans_notion,
+                   recherche_libre)
+
+MOT_CLE_PAR_DEFAUT = "autonomous AI agents"
 
 st.set_page_config(page_title="AgentWatch AI", layout="wide", page_icon="🤖")
 
@@ -22,85 +24,15 @@ notion_token = os.getenv("NOTION_TOKEN")
 notion_db = os.getenv("NOTION_DB_ID")
 
 
-def search_arxiv(query="autonomous AI agents", max_results=5, days=7):
-    base_url = "http://export.arxiv.org/api/query?"
-    encoded_query = urllib.parse.quote(query)
-    url = f"{base_url}search_query=all:{encoded_query}&start=0&max_results={max_results}&sortBy=lastUpdatedDate&sortOrder=descending"
-
-    feed = feedparser.parse(url)
-    cutoff = datetime.now() - pd.Timedelta(days=days)
-    results = []
-
-    for entry in feed.entries:
-        published = datetime.strptime(entry.published, "%Y-%m-%dT%H:%M:%SZ")
-        if published >= cutoff:
-            results.append({
-                "title": entry.title,
-                "summary": entry.summary,
-                "link": entry.link,
-                "published": entry.published
-            })
-    return results
-
-
-def get_google_news(query, api_key, max_results=5):
-    url = "https://serpapi.com/search"
-    params = {
-        "engine": "google",
-        "q": query,
-        "tbm": "nws",
-        "api_key": api_key,
-        "num": max_results
-    }
-    response = requests.get(url, params=params)
-    return response.json().get("news_results", []) if response.status_code == 200 else []
-
-def mots_cles():
-    return {
-        "Santé": ["healthcare AI", "medical agents", "AI diagnosis", "AI patient care"],
-        "Finance": ["AI investment", "AI in banking", "fraud detection AI", "autonomous financial agents"]
-    }
-
-def update_tendances():
-    st.session_state["tendances"] = {"Santé": [], "Finance": []}
-    for secteur, keywords in mots_cles().items():
-        for kw in keywords:
-            articles = search_arxiv(query=kw, max_results=1)
-            news = get_google_news(kw, serpapi_key, max_results=1)
-
-            for article in articles:
-                st.session_state["tendances"][secteur].append(f"📘 {article['title']}")
-            for item in news:
-                st.session_state["tendances"][secteur].append(f"🗞️ {item['title']}")
-
-
-# Lancer une 1re mise à jour au démarrage
-def mots_cles():
-    return {
-        "Santé": [
-            "healthcare AI",
-            "medical agents",
-            "AI diagnosis",
-            "AI patient care"
-        ],
-        "Finance": [
-            "AI investment",
-            "AI in banking",
-            "fraud detection AI",
-            "autonomous financial agents"
-        ]
-    }
-
-def schedule_job():
-    schedule.every(24).hours.do(update_tendances)
-    while True:
-        schedule.run_pending()
-        time.sleep(1)
-
-threading.Thread(target=schedule_job, daemon=True).start()
-
-if "tendances" not in st.session_state:
-    update_tendances()
+# ⏰ Rafraîchisseur unique par processus : lancé une seule fois, quel que soit le nombre de reruns.
+# Avec AGENTWATCH_INGESTION=externe, la collecte est laissée au démon (ingestion.py) : lecture seule
+scheduler.demarrer(serpapi_key, collecte=os.getenv("AGENTWATCH_INGESTION") != "externe")
+# Sans snapshot publié, seule la première exécution d'une session attend la collecte : les reruns
+# suivants affichent aussitôt l'état « en préparation »
+snapshot = scheduler.snapshot_courant(attente=0 if st.session_state.get("snapshot_attendu") else DELAI_GLOBAL)
+st.session_state["snapshot_attendu"] = True
+# 📦 Rapports pré-rendus, reconstruits en arrière-plan après chaque snapshot
+cache_rapports.demarrer(serpapi_key, [(secteur, "Tous", "Toutes", MOT_CLE_PAR_DEFAUT) for secteur in SECTEURS])
 
 st.title("🧠 AgentWatch AI – Veille Stratégique IA")
 st.markdown("**Analyse continue des avancées technologiques IA dans la santé et la finance.**")
@@ -117,81 +49,69 @@ st.sidebar.header("🎛️ Filtres")
 
 generate = st.sidebar.button("📊 Générer le rapport stratégique", key="generate_report")
 
-if st.sidebar.button("🔄 Mettre à jour les tendances maintenant", key="update_sidebar_button"):
-    update_tendances()
-    st.sidebar.success("✅ Tendances actualisées")
-
-secteurs = ["Santé", "Finance"]
-pays = ["Tous", "Canada", "États-Unis", "France", "Allemagne"]
-entreprises = ["Toutes", "Pfizer", "JP Morgan", "Mayo Clinic", "OpenAI", "Amazon"]
-
-selected_secteur = st.sidebar.selectbox("📂 Secteur", secteurs)
-selected_pays = st.sidebar.selectbox("🌍 Pays", pays)
-selected_entreprise = st.sidebar.selectbox("🏢 Entreprise", entreprises)
-search_keyword = st.sidebar.text_input("🔍 Recherche libre", value="autonomous AI agents")
-
-st.sidebar.markdown(f"📅 **Dernière mise à jour :** {datetime.now().strftime('%d %B %Y')}")
+update = st.sidebar.button("🔄 Mettre à jour les tendances maintenant", key="update_sidebar_button")
+if update:
+    scheduler.demander_rafraichissement()
+    precedent = snapshot.version
+    snapshot = scheduler.attendre_version(precedent, DELAI_GLOBAL)
+    if snapshot.version > precedent:
+        st.sidebar.success("✅ Tendances actualisées")
+    else:  # le leader d'un autre processus ne voit la demande qu'à son prochain sondage
+        st.sidebar.info("⏳ Actualisation en cours : les nouvelles tendances s’afficheront dès leur publication.")
+
+selected_secteur = st.sidebar.selectbox("📂 Secteur", SECTEURS)
+selected_pays = st.sidebar.selectbox("🌍 Pays", PAYS)
+selected_entreprise = st.sidebar.selectbox("🏢 Entreprise", ENTREPRISES)
+search_keyword = st.sidebar.text_input("🔍 Recherche libre", value=MOT_CLE_PAR_DEFAUT)
+
+statut = scheduler.statut()
+if statut["derniere_execution"]:
+    st.sidebar.markdown(f"📅 **Dernière mise à jour :** {datetime.fromtimestamp(statut['derniere_execution']).strftime('%d %B %Y – %H:%M')}")
+if statut["prochaine_execution"]:
+    st.sidebar.markdown(f"⏭️ **Prochaine mise à jour :** {datetime.fromtimestamp(statut['prochaine_execution']).strftime('%d %B %Y – %H:%M')}")
+
+# 🚦 Quota SerpAPI : l'interface se dégrade (données en cache / périmées) au lieu d'insister
+etat_news = etat_serpapi()
+st.sidebar.caption(f"🗞️ Budget SerpAPI du jour : {etat_news['budget_restant']} / {etat_news['quota_journalier']} requêtes")
+if etat_news["disjoncteur"] != "fermé" or etat_news["budget_restant"] == 0:
+    st.sidebar.warning("⚠️ Google News indisponible ou quota épuisé : actualités affichées depuis le cache.")
+
+# 🛠️ Métriques internes (AGENTWATCH_METRICS=1) : panneau d'administration + export Prometheus
+if metrics.ACTIF:
+    if os.getenv("AGENTWATCH_METRICS_PORT"):
+        metrics.demarrer_serveur(int(os.getenv("AGENTWATCH_METRICS_PORT")))
+    if os.getenv("AGENTWATCH_METRICS_FILE"):
+        metrics.ecrire_fichier(os.getenv("AGENTWATCH_METRICS_FILE"))
+    with st.sidebar.expander("🛠️ Métriques"):
+        resume_metriques = metrics.resume()
+        if resume_metriques["spans"]:
+            st.table(resume_metriques["spans"])
+        cache_stats = resume_metriques["cache"]
+        st.caption(f"🧊 Cache : {cache_stats['hits']} hits / {cache_stats['misses']} misses (ratio {cache_stats['ratio']}), {cache_stats['entrees']} entrées, {cache_stats['octets']} octets")
+        st.caption(f"📦 Octets reçus : {resume_metriques['octets']}")
+        paquets = cache_rapports.statistiques()
+        st.caption(f"📄 Rapports pré-rendus : {paquets['paquets']} en cache, {paquets['hits']} lectures directes, "
+                   f"{paquets['revalidations']} revalidations, {paquets['rendus']} rendus, "
+                   f"{paquets['echecs']} échecs de préchauffage")
+        st.caption(f"🧵 Threads de collecte actifs : {resume_metriques['threads_collecte']}")
 
 st.header("📡 Tendances IA par secteur – Santé & Finance")
 col1, col2 = st.columns(2)
 
 with col1:
     st.subheader("🏥 Santé")
-    for ligne in st.session_state["tendances"]["Santé"]:
+    for ligne in snapshot.tendances.get("Santé", ()):
         st.markdown(f"- {ligne}")
 
 with col2:
     st.subheader("💰 Finance")
-    for ligne in st.session_state["tendances"]["Finance"]:
+    for ligne in snapshot.tendances.get("Finance", ()):
         st.markdown(f"- {ligne}")
 
-def afficher_graphiques_secteur():
-    st.subheader("📈 Statistiques par secteur")
-    df = pd.DataFrame({
-        "Mois": ["Jan", "Fév", "Mars", "Avr"],
-        "Santé": [10, 14, 18, 22],
-        "Finance": [8, 10, 14, 19]
-    })
-    fig = px.line(df, x="Mois", y=["Santé", "Finance"], title="Évolution des projets IA", markers=True)
-    st.plotly_chart(fig, use_container_width=True)
-
-    pie = px.pie(
-        names=["Agent diagnostic", "NLP", "Support client", "Investissement", "Prévision"], 
-        values=[20, 25, 15, 30, 10],
-        title="Répartition des types d’agents IA observés"
-    )
-    st.plotly_chart(pie, use_container_width=True)
-
-
-    # Arxiv - Recherches scientifiques
-    for secteur, keywords in zip(["Santé", "Finance"], [mots_cles()["Santé"], mots_cles()["Finance"]]):
-        for kw in keywords:
-            # Recherche Arxiv
-            articles = search_arxiv(query=kw, max_results=1)
-            for article in articles:
-                st.session_state["tendances"][secteur].append(f"📘 {article['title']}")
-
-    for secteur, keywords in mots_cles.items():
-        for kw in keywords:
-            for result in search_arxiv(kw, max_results=1):
-                st.session_state["tendances"][secteur].append(f"📚 {result['title']}")
-            for article in get_google_news(kw, serpapi_key, max_results=1):
-                st.session_state["tendances"][secteur].append(f"🗞️ {article['title']}")
-
-    # SerpAPI - Actualités récentes
-    for secteur, keywords in zip(["Santé", "Finance"], [mots_cles()["Santé"], mots_cles()["Finance"]]):
-        for kw in keywords:
-            news = get_google_news(kw, serpapi_key, max_results=1)
-            for item in news:
-                st.session_state["tendances"][secteur].append(f"🗞️ {item['title']}")
-
-# Initialisation des tendances à la 1re ouverture
-if "tendances" not in st.session_state:
-    update_tendances()
-
-# Met à jour au démarrage si non encore chargé
-if "tendances" not in st.session_state:
-    update_tendances()
+if snapshot.version == 0:
+    st.info("⏳ Données en préparation : les tendances s’afficheront dès la publication du premier snapshot.")
+elif snapshot.manquants:
+    st.caption(f"⏳ Résultats partiels : {len(snapshot.manquants)} requête(s) sans réponse dans le délai imparti.")
 
 st.markdown("""
     <style>
@@ -201,142 +121,90 @@ st.markdown("""
     </style>
 """, unsafe_allow_html=True)
 
-if st.sidebar.button("🔄 Mettre à jour les tendances maintenant", key="update_sidebar_button_1"):
-    update_tendances()
-    st.sidebar.success("✅ Tendances actualisées")
-
 st.title("🧠 AgentWatch AI – Veille Stratégique IA")
 st.markdown("**Analyse des avancées en agents IA autonomes dans la santé et la finance.**")
 
-    # Arxiv
-for secteur, keywords in zip(["Santé", "Finance"], [mots_cles()["Santé"], mots_cles()["Finance"]]):
-    for kw in keywords: 
-        results = search_arxiv(query=kw, max_results=1)
-    for r in results:
-                titre = r["title"]
-st.session_state["tendances"][secteur].append(f"📚 {titre}")
-
-    # Google News
-for secteur, keywords in zip(["Santé", "Finance"], [mots_cles()["Santé"], mots_cles()["Finance"]]):
-    for kw in keywords:
-            news = get_google_news(kw, serpapi_key)
-    for article in news[:1]:
-        st.session_state["tendances"][secteur].append(f"🗞️ {article['title']}")
-
-if "tendances" not in st.session_state:
-    update_tendances()
 
+# 📦 Paquet du rapport (insights, recommandations, HTML d'export) pour les filtres donnés
+# Mesuré sous le nom historique : les recommandations sont désormais calculées avec le paquet
+@metrics.mesurer("analyse_salesforce")
+def paquet_rapport(secteur, pays, entreprise, mot_cle, local_seulement=False):
+    return cache_rapports.paquet_rapport(secteur, pays, entreprise, mot_cle, serpapi_key, local_seulement)
 
 
-# 🧠 Recommandation stratégique Salesforce
-def analyse_salesforce(secteur, insights, articles, news):
+# 🧠 Recommandation stratégique Salesforce (calculée avec le paquet du rapport)
+def analyse_salesforce(recommandations):
     st.markdown("### 🧠 Recommandation stratégique Salesforce")
-    recommandations = []
-
-    for insight in insights:
-        if secteur == "Santé" and ("suivi" in insight.lower() or "tri" in insight.lower()):
-            recommandations.append("Déployer un agent IA dans Salesforce HealthCloud.")
-        if secteur == "Finance" and "portefeuille" in insight.lower():
-            recommandations.append("Intégrer un assistant IA dans Financial Services Cloud.")
-        if "fraude" in insight.lower():
-            recommandations.append("Utiliser Einstein GPT pour la détection intelligente de fraude.")
-
-    for article in articles:
-        s = article["summary"].lower()
-        if secteur == "Santé" and "diagnostic" in s:
-            recommandations.append("Créer un outil IA pour l’aide au diagnostic dans Salesforce.")
-        if secteur == "Finance" and ("forecast" in s or "risk" in s):
-            recommandations.append("Ajouter un modèle prédictif de risque dans Financial Cloud.")
-        elif secteur == "Finance":
-            if "risk" in summary or "forecast" in summary:
-                recommandations.append("Intégrer une IA de prévision de risque dans Financial Services Cloud.")
-            if "autonomous agent" in summary:
-                recommandations.append("Explorer les agents autonomes pour l’automatisation des processus de scoring.")
-    
-    for n in news:
-        snip = n.get("snippet", "").lower()
-        if secteur == "Santé" and "ai" in snip and "patient" in snip:
-            recommandations.append("Développer un agent conversationnel patient dans HealthCloud.")
-        if secteur == "Finance" and "investment" in snip:
-            recommandations.append("Ajouter une IA de scoring d'investissement dans Salesforce.")
-
-    if not recommandations:
-        recommandations.append("Explorer des cas d’intégration IA récents dans Salesforce.")
-
     for reco in recommandations:
         st.info(f"💡 {reco}")
 
-    for article in news:
-        snippet = article.get("snippet", "").lower()
-        if secteur == "Santé" and "ai" in snippet and "patient" in snippet:
-            recommandations.append("Développer un agent conversationnel IA pour le suivi patient dans HealthCloud.")
-        elif secteur == "Finance" and "investment" in snippet:
-            recommandations.append("Étendre Salesforce avec une IA d’analyse des comportements d’investissement.")
-
-    # 🧭 Fallback
-    if not recommandations:
-        recommandations.append("🧭 Explorer les dernières intégrations IA dans l’environnement Salesforce pour ce secteur.")
 
+# 📤 Export PDF : rendu en arrière-plan, mis en cache par empreinte du HTML
+@metrics.mesurer("export_pdf")
+def export_pdf(html, entreprise):
+    cle = pdf_worker.soumettre(html)
+    st.session_state["dernier_export_pdf"] = cle  # travail suivi par la session (et par le test de charge)
+    suivre_export_pdf(cle, f"rapport_ia_{entreprise}_{datetime.now().strftime('%Y%m%d')}.pdf")
 
-# 📡 Tendances dynamiques (mise à jour auto + manuelle)
-if update or generate:
-    st.header("📡 Tendances IA – Actualisation intelligente Santé & Finance")
-
-    keywords_sante = "healthcare AI agent OR autonomous medical agent OR diagnostic AI OR patient AI"
-    keywords_finance = "finance AI agent OR investment AI OR fraud detection AI OR autonomous finance agent"
 
+# ⏳ Suivi du rendu : seul ce fragment se réexécute pendant que wkhtmltopdf travaille
+@st.fragment
+def suivre_export_pdf(cle, nom_fichier):
+    travail = pdf_worker.etat(cle)
+    if travail is None:
+        return
+    if travail["etat"] == "erreur":
+        st.error("❌ Erreur : wkhtmltopdf n’est pas installé ou mal configuré.")
+    elif travail["etat"] == "terminé":
+        st.download_button("📥 Télécharger le PDF", pdf_worker.lire(cle), file_name=nom_fichier)
+    else:
+        st.progress(travail["progression"], text="Génération du fichier PDF...")
+        time.sleep(0.5)
+        st.rerun(scope="fragment")
 
-    # Recherches dynamiques
-    articles_sante = search_arxiv(query=keywords_sante, max_results=3)
-    articles_finance = search_arxiv(query=keywords_finance, max_results=3)
-    news_sante = get_google_news(keywords_sante, serpapi_key, max_results=2)
-    news_finance = get_google_news(keywords_finance, serpapi_key, max_results=2)
 
-    col1, col2 = st.columns(2)
+# 📡 Tendances dynamiques (mise à jour manuelle ou génération du rapport)
+# Chaque section est un fragment : ses propres widgets ne relancent qu'elle, et les collectes
+# passent par le cache des requêtes — un rerun ne refait aucun appel réseau.
+MOTS_CLES_ACTUALISATION = {
+    "Santé": "healthcare AI agent OR autonomous medical agent OR diagnostic AI OR patient AI",
+    "Finance": "finance AI agent OR investment AI OR fraud detection AI OR autonomous finance agent",
+}
 
-    with col1:
-        st.subheader("🏥 Santé")
-        if articles_sante:
-            for a in articles_sante:
-                st.markdown(f"📘 [{a['title']}]({a['link']}) — *{a['published'][:10]}*")
-        if news_sante:
-            for n in news_sante:
-                st.markdown(f"🗞️ [{n['title']}]({n['link']})")
 
-    with col2:
-        st.subheader("💰 Finance")
-        if articles_finance:
-            for a in articles_finance:
+@st.fragment
+def section_actualisation():
+    st.header("📡 Tendances IA – Actualisation intelligente Santé & Finance")
+    for colonne, (secteur, keywords) in zip(st.columns(2), MOTS_CLES_ACTUALISATION.items()):
+        with colonne:
+            st.subheader("🏥 Santé" if secteur == "Santé" else "💰 Finance")
+            for a in search_arxiv(query=keywords, max_results=3):
                 st.markdown(f"📘 [{a['title']}]({a['link']}) — *{a['published'][:10]}*")
-        if news_finance:
-            for n in news_finance:
+            try:
+                news = get_google_news(keywords, serpapi_key, max_results=2)
+            except ErreurSerpAPI:
+                news = []
+                st.caption("🗞️ Google News indisponible pour le moment.")
+            for n in news:
                 st.markdown(f"🗞️ [{n['title']}]({n['link']})")
 
     st.caption(f"⏱ Données mises à jour le {datetime.now().strftime('%d %B %Y – %H:%M')}")
 
 
-# 🔄 Sections dynamiques
-if update:
-    # Avant : analyse_salesforce(...)
-    analyse_salesforce(selected_secteur, selected_entreprise, insights, articles, news)
-    arxiv_query = f"{search_keyword} {selected_entreprise} {selected_secteur}"
-    articles = search_arxiv(arxiv_query)
-    news = get_google_news(f"{selected_entreprise} {search_keyword}", serpapi_key)
-
-    st.header("📚 Études scientifiques (Arxiv)")
-    if articles:
-        for article in articles:
-                st.markdown(f"### [{article['title']}]({article['link']})")
-                st.markdown(f"📅 {article['published']}")
-                st.markdown(article['summary'][:400] + "...")
-    else:
-        st.info("Aucune étude Arxiv trouvée.")
+# 📰 Recherches scientifiques et actualités pour les filtres courants (index local d'abord)
+@st.fragment
+def section_recherches(secteur, pays, entreprise, mot_cle):
+    debut = time.perf_counter()
+    articles, news, origine = recherche_libre(mot_cle, secteur, pays, entreprise, serpapi_key)
+    duree_ms = 1000 * (time.perf_counter() - debut)
 
-    # 📰 Recherches scientifiques (Arxiv)
     st.header("📰 Recherches scientifiques (Arxiv)")
-    arxiv_query = f"{search_keyword} {selected_entreprise} {selected_secteur}"
-    articles = search_arxiv(query=arxiv_query)
-
+    if origine == "local":
+        st.caption(f"⚡ Résultats de l’index local en {duree_ms:.0f} ms")
+    elif origine == "partiel":
+        st.caption("🌐 Aucun résultat local : API en partie indisponibles, résultats incomplets")
+    else:
+        st.caption("🌐 Aucun résultat local : résultats des API, désormais indexés")
     if articles:
         for article in articles:
             st.markdown(f"### [{article['title']}]({article['link']})")
@@ -344,11 +212,11 @@ if update:
             st.markdown(article['summary'][:400] + "...")
             st.markdown("---")
     else:
-        st.warning("Aucun article scientifique trouvé.")
+        st.warning("Aucun article scientifique trouvé pour ces filtres.")
 
     # 🗞️ Google News
-    if selected_entreprise != "Toutes":
-         st.header("🗞️ Actualités Google News")
+    if entreprise != "Toutes":
+        st.header("🗞️ Actualités Google News")
     if news:
         for item in news:
             st.markdown(f"### [{item['title']}]({item['link']})")
@@ -356,188 +224,79 @@ if update:
     else:
         st.warning("Pas d’actualités récentes.")
 
-    insights, note_pays, note_entreprise = get_insights_data(selected_secteur, selected_pays, selected_entreprise)
 
-    # 📄 Rapport Stratégique
-    st.header("📄 Rapport Stratégique")
-    for i in insights:
-        st.markdown(f"- {i}")
-    if note_pays: st.markdown(note_pays)
-    if note_entreprise: st.markdown(note_entreprise)
-
-    analyse_salesforce(selected_secteur, selected_entreprise, insights, articles, news)
-
-    st.markdown(f"🕒 Rapport généré le : **{datetime.now().strftime('%d %B %Y')}**")
-
-    # 📤 Export PDF (option mono-entreprise uniquement)
-    if selected_entreprise != "Toutes":
-        if st.button("📤 Exporter ce rapport en PDF"):
-            st.success("Export en cours...")
-
-            insights_html = "".join(f"<li>{i}</li>" for i in insights)
-            html = f"""
-            <html><head><meta charset='UTF-8'></head><body>
-            <h1>Rapport de veille stratégique IA</h1>
-            <hr>
-            <p><strong>Secteur :</strong> {selected_secteur}</p>
-            <p><strong>Pays :</strong> {selected_pays}</p>
-            <p><strong>Entreprise :</strong> {selected_entreprise}</p>
-            <p><strong>Date :</strong> {datetime.now().strftime('%d %B %Y')}</p>
-            <h2>🧠 Informations clés :</h2>
-            <ul>{insights_html}</ul>
-            <p>{note_pays}</p>
-            <p>{note_entreprise}</p>
-            </body></html>
-            """
-
-            with st.spinner("Génération du fichier PDF..."):
-                pdfkit.from_string(html, "rapport_ia.pdf")
-                with open("rapport_ia.pdf", "rb") as f:
-                    st.download_button("📥 Télécharger le PDF", f, file_name="rapport_ia.pdf")
-
-
-# 🔄 Sections dynamiques après clic sur le bouton
-if update:
-
-    # 📰 Recherches scientifiques (Arxiv)
-    st.header("📰 Recherches scientifiques (Arxiv)")
-    query = f"{selected_entreprise} {selected_secteur} autonomous agents"
-    articles = search_arxiv(query=query)
-
-    if articles:
-        for article in articles:
-            st.markdown(f"### [{article['title']}]({article['link']})")
-            st.markdown(f"📅 {article['published']}")
-            st.markdown(article['summary'][:400] + "...")
-            st.markdown("---")
-    else:
-        st.warning("Aucun article scientifique trouvé pour ces filtres.")
+if update or generate:
+    section_actualisation()
 
-def fetch_research_and_news(sector_keywords):
-    articles = search_arxiv(query=sector_keywords, max_results=3)
-    news = get_google_news(sector_keywords, serpapi_key, max_results=2)
-    return articles, news
+if update:
+    section_recherches(selected_secteur, selected_pays, selected_entreprise, search_keyword)
 
 
-# 📊 Visualisations dynamiques
+# 📊 Visualisations : agrégats incrémentaux de la base locale, figures partagées par version
 def afficher_graphiques_secteur():
     st.subheader("📈 Statistiques par secteur")
-    df = pd.DataFrame({
-        "Mois": ["Jan", "Fév", "Mars", "Avr"],
-        "Santé": [10, 14, 18, 22],
-        "Finance": [8, 10, 14, 19]
-    })
-    fig = px.line(df, x="Mois", y=["Santé", "Finance"], title="Évolution des projets IA", markers=True)
-    st.plotly_chart(fig, use_container_width=True)
-
-    pie = px.pie(
-        names=["Agent diagnostic", "NLP", "Support client", "Investissement", "Prévision"], 
-        values=[20, 25, 15, 30, 10],
-        title="Répartition des types d’agents IA observés"
-    )
-    st.plotly_chart(pie, use_container_width=True)
+    figures = figures_courantes()
+    if figures is None:
+        st.info("📭 Pas encore d’articles collectés pour les statistiques.")
+        return
+    for figure in figures:
+        st.plotly_chart(figure, use_container_width=True)
+
 
 # 📌 Plan d’action stratégique
-    def afficher_plan_action(secteur, entreprise):
-        st.subheader("📌 Plan d’action stratégique")
-        actions = {
-            "Santé": [
-                "✅ Analyser les parcours patients et intégrer un agent IA de suivi",
-                "✅ Créer un partenariat avec une startup MedTech IA",
-                "✅ Déployer un pilote sur un cas d’usage clinique ciblé"
-            ],
-            "Finance": [
-                "✅ Intégrer un assistant IA dans l’espace client Salesforce",
-                "✅ Automatiser la détection de risque avec des agents LLM",
-                "✅ Évaluer l’impact réglementaire des IA autonomes"
-            ],
+def afficher_plan_action(secteur, entreprise):
+    st.subheader("📌 Plan d’action stratégique")
+    actions = {
+        "Santé": [
+            "✅ Analyser les parcours patients et intégrer un agent IA de suivi",
+            "✅ Créer un partenariat avec une startup MedTech IA",
+            "✅ Déployer un pilote sur un cas d’usage clinique ciblé"
+        ],
+        "Finance": [
+            "✅ Intégrer un assistant IA dans l’espace client Salesforce",
+            "✅ Automatiser la détection de risque avec des agents LLM",
+            "✅ Évaluer l’impact réglementaire des IA autonomes"
+        ],
     }
     for action in actions.get(secteur, ["⚠️ Analyse IA stratégique en cours."]):
         st.markdown(action)
 
 
-# 📄 Rapport Stratégique
-st.header("📄 Rapport Stratégique")
-def get_insights_data(secteur, pays, entreprise):
-    data = {
-        "Santé": [
-            "Pfizer investit dans des agents IA pour le suivi post-opératoire.",
-            "Mayo Clinic pilote un programme IA pour le tri des patients chroniques."
-        ],
-        "Finance": [
-            "JP Morgan lance un assistant IA pour la gestion de portefeuille.",
-            "Goldman Sachs utilise des IA pour la détection de fraude en temps réel."
-        ]
-    }
+afficher_graphiques_secteur()
 
-    pays_note = f"📍 Activités IA repérées en **{pays}**" if pays != "Tous" else ""
-    entreprise_note = f"🔎 Focus sur **{entreprise}**" if entreprise != "Toutes" else ""
-    return data.get(secteur, []), pays_note, entreprise_note
 
-# ⬅️ Cette ligne est essentielle pour initialiser insights avant de l'utiliser
-insights, note_pays, note_entreprise = get_insights_data(selected_secteur, selected_pays, selected_entreprise)
+# 📄 Rapport Stratégique
+# Lu depuis le cache des rapports, comme la section générée : l'export PDF contient aussi les recommandations.
+# Affichée à chaque rerun : index local seulement, les API restent réservées à « Générer » et « Mettre à jour »
+st.header("📄 Rapport Stratégique")
+paquet = paquet_rapport(selected_secteur, selected_pays, selected_entreprise, search_keyword, local_seulement=True)
 
 st.markdown(f"### 📌 Rapport – {selected_entreprise}")
 
-if insights:
-    for i in insights:
+if paquet.insights:
+    for i in paquet.insights:
         st.markdown(f"- {i}")
 else:
     st.warning("Aucune donnée disponible.")
 
-if note_pays:
-    st.markdown(note_pays)
+if paquet.note_pays:
+    st.markdown(paquet.note_pays)
 
-if note_entreprise:
-    st.markdown(note_entreprise)
+if paquet.note_entreprise:
+    st.markdown(paquet.note_entreprise)
 
 st.markdown(f"🕒 Rapport généré le : **{datetime.now().strftime('%d %B %Y')}**")
 
-# 📤 Export PDF sécurisé
-def export_pdf(secteur, pays, entreprise, insights, note_pays, note_entreprise):
-    html = f"""
-    <html><head><meta charset='UTF-8'></head><body>
-    <h1>Rapport de veille stratégique IA</h1>
-    <hr>
-    <p><strong>Secteur :</strong> {secteur}</p>
-    <p><strong>Pays :</strong> {pays}</p>
-    <p><strong>Entreprise :</strong> {entreprise}</p>
-    <p><strong>Date :</strong> {datetime.now().strftime('%d %B %Y')}</p>
-    <h2>🧠 Informations clés :</h2>
-    <ul>{''.join(f"<li>{i}</li>" for i in insights)}</ul>
-    <p>{note_pays}</p>
-    <p>{note_entreprise}</p>
-    </body></html>
-    """
-    try:
-        pdfkit.from_string(html, "rapport_ia.pdf")
-        with open("rapport_ia.pdf", "rb") as f:
-            st.download_button(
-                "📥 Télécharger le PDF",
-                f,
-                file_name=f"rapport_ia_{entreprise}_{datetime.now().strftime('%Y%m%d')}.pdf"
-            )
-    except OSError:
-        st.error("❌ Erreur : wkhtmltopdf n’est pas installé ou mal configuré.")
-
-
 # 📤 Bouton d’export PDF (si entreprise sélectionnée)
 if selected_entreprise != "Toutes":
     st.subheader("📤 Export du rapport")
     if st.button("📤 Exporter ce rapport en PDF", key="export_pdf_button_sidebar"):
-        export_pdf(
-            selected_secteur,
-            selected_pays,
-            selected_entreprise,
-            insights,
-            note_pays,
-            note_entreprise
-        )
+        export_pdf(paquet.html, selected_entreprise)
 
 
 # 🗃️ Bouton d'enregistrement dans Notion
 if st.button("🗃 Enregistrer dans Notion", key="notion_save_button"):
-    contenu = f"Insights : {' | '.join(insights)}\n\n{note_pays}\n{note_entreprise}"
+    contenu = f"Insights : {' | '.join(paquet.insights)}\n\n{paquet.note_pays}\n{paquet.note_entreprise}"
     enregistrer_dans_notion(
         titre="Rapport IA – " + selected_entreprise,
         contenu=contenu,
@@ -547,28 +306,32 @@ if st.button("🗃 Enregistrer dans Notion", key="notion_save_button"):
     )
 
 # ▶️ Lancement du rapport stratégique
-if generate:
+# Le rapport reste affiché après le clic : ses boutons ne relancent que ce fragment, et un
+# changement de filtre le relit depuis le cache des rapports, sans toucher aux tendances.
+@st.fragment
+def section_rapport(secteur, pays, entreprise, mot_cle):
     st.success("✅ Rapport généré avec succès")
-    insights, note_pays, note_entreprise = get_insights_data(selected_secteur, selected_pays, selected_entreprise)
-    articles, news = fetch_research_and_news(search_keyword)
+    paquet = paquet_rapport(secteur, pays, entreprise, mot_cle)
 
     st.subheader("📌 Rapport stratégique – Synthèse")
-    for i in insights:
-        st.markdown(f"- {i}")
-    if note_pays: st.markdown(note_pays)
-    if note_entreprise: st.markdown(note_entreprise)
+    st.markdown(paquet.markdown)
 
-    analyse_salesforce(selected_secteur, selected_entreprise, insights, articles, news)
+    analyse_salesforce(paquet.recommandations)
 
     col1, col2 = st.columns(2)
     with col1:
-        if st.button("📤 Export PDF"):
-            export_pdf(selected_secteur, selected_entreprise, insights)
+        if st.button("📤 Export PDF", key="export_pdf_rapport"):
+            export_pdf(paquet.html, entreprise)
     with col2:
-        if st.button("🗃 Enregistrer dans Notion"):
-            contenu = " | ".join(insights)
-            enregistrer_dans_notion("Rapport IA", contenu, selected_secteur, selected_entreprise)
-            st.success("Rapport enregistré dans Notion ✅")
+        if st.button("🗃 Enregistrer dans Notion", key="notion_save_rapport"):
+            contenu = " | ".join(paquet.insights)
+            enregistrer_dans_notion("Rapport IA", contenu, secteur, pays, entreprise)
+
+
+if generate:
+    st.session_state["rapport_genere"] = True
+if st.session_state.get("rapport_genere"):
+    section_rapport(selected_secteur, selected_pays, selected_entreprise, search_keyword)
 
 # ✅ Footer
 st.markdown("---")
@@ -0,0 +1,110 @@
+import xml.etree.ElementTree as ET
+
+import http_client
+from metrics import compter_octets
+
+# 📥 Lecture en flux du fil Atom d'Arxiv.
+# Le XML est analysé au fil des morceaux reçus (XMLPullParser) : chaque <entry> complète devient
+# un petit dict puis est libérée. La requête trie par lastUpdatedDate décroissante ; dès qu'une
+# entrée a été mise à jour avant la date limite, toutes les suivantes le sont aussi (updated ≥
+# published) : on arrête de lire la socket. Mémoire et temps d'analyse suivent ce qu'on garde,
+# pas la taille du fil.
+
+ATOM = "{http://www.w3.org/2005/Atom}"
+TAILLE_MORCEAU = 16 * 1024
+FORMAT_DATE = "%Y-%m-%dT%H:%M:%SZ"
+
+
+class ErreurArxiv(Exception):
+    pass
+
+
+# Résultat vide servi à l'affichage quand Arxiv est en erreur : mis en cache comme un vide,
+# mais reconnaissable par ceux qui ne doivent pas le prendre pour une réponse
+class ResultatEnErreur(list):
+    en_erreur = True
+
+
+def _texte(entry, balise):
+    element = entry.find(ATOM + balise)
+    return element.text.strip() if element is not None and element.text else ""
+
+
+def _lien(entry):
+    for lien in entry.iter(ATOM + "link"):
+        if lien.get("rel") == "alternate":
+            return lien.get("href", "")
+    return _texte(entry, "id")
+
+
+def _entrees(morceaux, limite, inclure_cutoff, bilan):
+    parser = ET.XMLPullParser(events=("start", "end"))
+    racine = None
+    for morceau in morceaux:
+        parser.feed(morceau)
+        for evenement, element in parser.read_events():
+            if evenement == "start":
+                if racine is None:
+                    racine = element
+                continue
+            if element.tag != ATOM + "entry":
+                continue
+
+            bilan["entrees"] += 1
+            updated = _texte(element, "updated")
+            published = _texte(element, "published")
+            if updated and updated < limite:
+                bilan["coupe"] = True
+                return  # fin de la fenêtre : on arrête de lire la suite
+
+            if published > limite or (inclure_cutoff and published == limite):
+                yield {
+                    "id": _texte(element, "id"),
+                    "title": _texte(element, "title"),
+                    "summary": _texte(element, "summary"),
+                    "link": _lien(element),
+                    "published": published,
+                }
+            racine.remove(element)
+
+
+# 🔁 Générateur d'articles publiés après `cutoff` (inclus si `inclure_cutoff`).
+# `bilan`, si fourni, reçoit le nombre d'entrées lues et si la date limite a été atteinte
+# (utile à la pagination : inutile de demander la page suivante).
+# Une réponse en erreur lève ErreurArxiv : elle ne doit pas passer pour un fil vide.
+def lire_flux_arxiv(url, cutoff, inclure_cutoff=True, bilan=None):
+    bilan = bilan if bilan is not None else {}
+    bilan.update(entrees=0, coupe=False)
+    # Dates Atom au format ISO fixe : la comparaison de chaînes remplace un strptime par entrée
+    limite = cutoff.strftime(FORMAT_DATE)
+
+    # Revalidation : le corps mémorisé peut n'être qu'un début de fil (lecture arrêtée à la date
+    # limite) ; il ne sert que s'il couvre la limite demandée
+    connu = http_client.validateur(url)
+    if connu and not (connu.meta.get("complet") or connu.meta.get("limite", limite) <= limite):
+        connu = None
+
+    with http_client.get(url, stream=True, headers=http_client.entetes_conditionnels(connu)) as response:
+        if response.status_code == 304 and connu:
+            bilan["revalide"] = True
+            yield from _entrees([connu.contenu], limite, inclure_cutoff, bilan)
+            return
+        if response.status_code != 200:
+            raise ErreurArxiv(f"Arxiv a répondu {response.status_code}")
+
+        # Le corps lu n'est gardé que si la réponse permet une revalidation (ETag / Last-Modified)
+        revalidable = bool(response.headers.get("ETag") or response.headers.get("Last-Modified"))
+        lus = []
+        octets = 0
+        def morceaux():
+            nonlocal octets
+            for morceau in response.iter_content(chunk_size=TAILLE_MORCEAU):
+                octets += len(morceau)
+                if revalidable:
+                    lus.append(morceau)
+                yield morceau
+
+        yield from _entrees(morceaux(), limite, inclure_cutoff, bilan)
+        compter_octets("arxiv", octets)
+        if revalidable:
+            http_client.memoriser(url, response, b"".join(lus), complet=not bilan["coupe"], limite=limite)
@@ -0,0 +1,179 @@
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from replay import ServeurRejeu
+
+# ⏱️ Banc de mesure de bout en bout, hors ligne.
+# Les API Arxiv / SerpAPI sont remplacées par le serveur de rejeu (latence et taux d'erreur
+# réglables) ; l'application est exécutée sans navigateur avec AppTest de Streamlit.
+# Mesures : premier affichage d'une session à froid puis à chaud, durée d'un rafraîchissement
+# des tendances, génération du rapport et export PDF (si wkhtmltopdf est installé).
+# Le coût d'import des modules chargés par app.py est relevé à part (`python -X importtime`) :
+# une dépendance lourde qui réapparaît au démarrage se voit immédiatement.
+
+MODULES_APP = ("metrics", "pdf_worker", "scheduler", "quota", "fetch_engine", "regles", "statistiques", "utils",
+               "cache_rapports")
+# Chargées uniquement par les chemins qui en ont besoin (graphiques, export PDF, Notion)
+IMPORTS_DIFFERES = ("pandas", "plotly", "pdfkit", "notion_client", "feedparser")
+
+
+def _chrono(fonction):
+    debut = time.perf_counter()
+    resultat = fonction()
+    return time.perf_counter() - debut, resultat
+
+
+def _resume(durees):
+    durees = sorted(durees)
+    if not durees:
+        return {}
+    return {
+        "n": len(durees),
+        "min": durees[0],
+        "p50": statistics.median(durees),
+        "p95": durees[min(len(durees) - 1, int(round(0.95 * (len(durees) - 1))))],
+        "max": durees[-1],
+    }
+
+
+# 📦 Temps d'import (cumulé, en secondes) des modules du démarrage, dans un interpréteur neuf
+def mesurer_imports(modules=MODULES_APP, plus_lents=10):
+    sortie = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import " + ", ".join(modules)],
+        capture_output=True, text=True, cwd=os.path.dirname(os.path.abspath(__file__)),
+    ).stderr
+    cumuls = {}
+    total = 0.0
+    for ligne in sortie.splitlines():
+        if not ligne.startswith("import time:") or "|" not in ligne:
+            continue
+        _, cumul, nom = ligne[len("import time:"):].split("|")
+        if not cumul.strip().isdigit():
+            continue
+        cumuls[nom.strip()] = int(cumul) / 1e6
+        if not nom[1:].startswith(" "):  # import de premier niveau : pas de double comptage
+            total += int(cumul) / 1e6
+    racines = {nom.split(".")[0] for nom in cumuls}
+    return {
+        "total": total,
+        "plus_lents": sorted(((nom, duree) for nom, duree in cumuls.items() if "." not in nom),
+                             key=lambda x: -x[1])[:plus_lents],
+        "charges_au_demarrage": sorted(racines.intersection(IMPORTS_DIFFERES)),
+    }
+
+
+def mesurer(repetitions=3, latence=0.2, gigue=0.05, taux_erreur=0.0, fixtures="fixtures", timeout=120):
+    imports = mesurer_imports()
+    serveur = ServeurRejeu(fixtures, latence, gigue, taux_erreur).demarrer()
+    # Doit précéder tout import des modules de l'application : URL des API et dossier de données
+    os.environ.update(serveur.environnement())
+    os.environ["AGENTWATCH_DATA_DIR"] = tempfile.mkdtemp(prefix="agentwatch-bench-")
+    os.environ.setdefault("SERPAPI_KEY", "banc-de-mesure")
+
+    from streamlit.testing.v1 import AppTest
+
+    mesures = {"premier_affichage_froid": [], "premier_affichage_chaud": [], "rafraichissement": [],
+               "generation_rapport": [], "export_pdf": []}
+    erreurs = []
+
+    def nouvelle_session():
+        return AppTest.from_file("app.py", default_timeout=timeout)
+
+    # Session à froid : aucun snapshot, aucun cache — le premier affichage attend la collecte
+    session = nouvelle_session()
+    duree, _ = _chrono(session.run)
+    mesures["premier_affichage_froid"].append(duree)
+    erreurs.extend(str(e.value) for e in session.exception)
+
+    import cache
+    import scheduler
+    from utils import html_rapport, get_insights_data
+
+    for _ in range(repetitions):
+        session = nouvelle_session()
+        duree, _ = _chrono(session.run)
+        mesures["premier_affichage_chaud"].append(duree)
+
+        cache.cache_requetes.vider()
+        duree, _ = _chrono(lambda: scheduler.calculer_tendances(os.environ["SERPAPI_KEY"], tout=True))
+        mesures["rafraichissement"].append(duree)
+
+        bouton = session.sidebar.button(key="generate_report")
+        duree, _ = _chrono(lambda: bouton.click().run())
+        mesures["generation_rapport"].append(duree)
+        erreurs.extend(str(e.value) for e in session.exception)
+
+    if shutil.which("wkhtmltopdf"):
+        import pdf_worker
+        insights, note_pays, note_entreprise = get_insights_data("Santé", "Canada", "Pfizer")
+        for i in range(repetitions):
+            # HTML distinct à chaque essai : on mesure un vrai rendu, pas le cache par empreinte
+            html = html_rapport("Santé", "Canada", f"Pfizer {i} {time.time()}", insights, note_pays, note_entreprise)
+
+            def rendre():
+                cle = pdf_worker.soumettre(html)
+                while pdf_worker.etat(cle)["etat"] not in ("terminé", "erreur"):
+                    time.sleep(0.05)
+            duree, _ = _chrono(rendre)
+            mesures["export_pdf"].append(duree)
+
+    serveur.arreter()
+    return {
+        "parametres": {"repetitions": repetitions, "latence": latence, "gigue": gigue, "taux_erreur": taux_erreur},
+        "mesures": {nom: _resume(durees) for nom, durees in mesures.items()},
+        "imports": imports,
+        "requetes_amont": serveur.compteurs,
+        "erreurs": sorted(set(erreurs)),
+    }
+
+
+def afficher(rapport):
+    print(f"{'Mesure':<26}{'n':>4}{'p50 (s)':>10}{'p95 (s)':>10}{'max (s)':>10}")
+    for nom, resume in rapport["mesures"].items():
+        if not resume:
+            print(f"{nom:<26}{'—':>4}")
+            continue
+        print(f"{nom:<26}{resume['n']:>4}{resume['p50']:>10.3f}{resume['p95']:>10.3f}{resume['max']:>10.3f}")
+    imports = rapport["imports"]
+    print(f"Imports au démarrage : {imports['total']:.3f} s — "
+          + ", ".join(f"{nom} {duree:.3f}" for nom, duree in imports["plus_lents"]))
+    for module in imports["charges_au_demarrage"]:
+        print(f"⚠️ {module} est importé au démarrage alors qu'il devrait être différé")
+    print(f"Requêtes reçues par le serveur de rejeu : {rapport['requetes_amont']}")
+    for erreur in rapport["erreurs"]:
+        print(f"⚠️ {erreur}")
+
+
+# ▶️ `python benchmark.py --repetitions 5 --latence 0.3 --json bench.json`
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Banc de mesure hors ligne d'AgentWatch AI")
+    parser.add_argument("--repetitions", type=int, default=3)
+    parser.add_argument("--latence", type=float, default=0.2, help="latence simulée des API (s)")
+    parser.add_argument("--gigue", type=float, default=0.05)
+    parser.add_argument("--erreurs", type=float, default=0.0, help="taux d'erreurs simulées (0 à 1)")
+    parser.add_argument("--fixtures", default="fixtures")
+    parser.add_argument("--json", help="écrire aussi le rapport dans ce fichier")
+    parser.add_argument("--imports", action="store_true", help="mesurer seulement le temps d'import au démarrage")
+    args = parser.parse_args()
+
+    if args.imports:
+        imports = mesurer_imports()
+        print(f"Imports au démarrage : {imports['total']:.3f} s")
+        for nom, duree in imports["plus_lents"]:
+            print(f"  {nom:<30}{duree:>8.3f} s")
+        for module in imports["charges_au_demarrage"]:
+            print(f"⚠️ {module} est importé au démarrage alors qu'il devrait être différé")
+        raise SystemExit(1 if imports["charges_au_demarrage"] else 0)
+
+    rapport = mesurer(args.repetitions, args.latence, args.gigue, args.erreurs, args.fixtures)
+    afficher(rapport)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(rapport, f, ensure_ascii=False, indent=2)
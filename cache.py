@@ -0,0 +1,145 @@
+import functools
+import hashlib
+import inspect
+import json
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+# 🧊 Cache partagé par tout le processus (hors st.session_state) pour les appels Arxiv / SerpAPI.
+# Niveau mémoire : LRU borné en nombre d'entrées et en octets, TTL propre à chaque source.
+# Niveau disque (optionnel, via AGENTWATCH_CACHE_DIR) : SQLite, survit aux redémarrages.
+
+TTL_PAR_SOURCE = {"arxiv": 6 * 3600, "news": 3600}
+TTL_VIDE = 300  # un résultat vide (ou une erreur avalée) est re-tenté plus vite
+MAX_ENTREES = 512
+MAX_OCTETS = 32 * 1024 * 1024
+
+
+class CacheTTL:
+    def __init__(self, max_entrees=MAX_ENTREES, max_octets=MAX_OCTETS, chemin_disque=None):
+        self.max_entrees = max_entrees
+        self.max_octets = max_octets
+        self._entrees = OrderedDict()  # cle -> (expire_le, taille, valeur)
+        self._octets = 0
+        self._verrou = threading.Lock()
+        self._disque = None
+        if chemin_disque:
+            os.makedirs(os.path.dirname(chemin_disque) or ".", exist_ok=True)
+            self._disque = sqlite3.connect(chemin_disque, check_same_thread=False)
+            self._disque.execute(
+                "CREATE TABLE IF NOT EXISTS cache (cle TEXT PRIMARY KEY, expire_le REAL, valeur BLOB)"
+            )
+            self._disque.commit()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, cle):
+        maintenant = time.time()
+        with self._verrou:
+            entree = self._entrees.get(cle)
+            if entree is not None:
+                if entree[0] > maintenant:
+                    self._entrees.move_to_end(cle)
+                    self.hits += 1
+                    return True, entree[2]
+                self._retirer(cle)
+            if self._disque is not None:
+                ligne = self._disque.execute(
+                    "SELECT expire_le, valeur FROM cache WHERE cle = ?", (cle,)
+                ).fetchone()
+                if ligne and ligne[0] > maintenant:
+                    valeur = pickle.loads(ligne[1])
+                    self._inserer(cle, valeur, ligne[0], len(ligne[1]))
+                    self.hits += 1
+                    return True, valeur
+            self.misses += 1
+            return False, None
+
+    def set(self, cle, valeur, ttl):
+        blob = pickle.dumps(valeur, protocol=pickle.HIGHEST_PROTOCOL)
+        expire_le = time.time() + ttl
+        with self._verrou:
+            self._inserer(cle, valeur, expire_le, len(blob))
+            if self._disque is not None:
+                self._disque.execute(
+                    "INSERT OR REPLACE INTO cache (cle, expire_le, valeur) VALUES (?, ?, ?)",
+                    (cle, expire_le, blob)
+                )
+                self._disque.execute("DELETE FROM cache WHERE expire_le <= ?", (time.time(),))
+                self._disque.commit()
+
+    def vider(self):
+        with self._verrou:
+            self._entrees.clear()
+            self._octets = 0
+            if self._disque is not None:
+                self._disque.execute("DELETE FROM cache")
+                self._disque.commit()
+
+    def statistiques(self):
+        with self._verrou:
+            return {"entrees": len(self._entrees), "octets": self._octets, "hits": self.hits, "misses": self.misses}
+
+    def _inserer(self, cle, valeur, expire_le, taille):
+        if cle in self._entrees:
+            self._retirer(cle)
+        if taille > self.max_octets:
+            return
+        self._entrees[cle] = (expire_le, taille, valeur)
+        self._octets += taille
+        # Éviction LRU tant qu'une des deux bornes est dépassée
+        while len(self._entrees) > self.max_entrees or self._octets > self.max_octets:
+            self._retirer(next(iter(self._entrees)))
+
+    def _retirer(self, cle):
+        _, taille, _ = self._entrees.pop(cle)
+        self._octets -= taille
+
+
+def _cache_par_defaut():
+    dossier = os.getenv("AGENTWATCH_CACHE_DIR")
+    return CacheTTL(chemin_disque=os.path.join(dossier, "requetes.sqlite") if dossier else None)
+
+
+cache_requetes = _cache_par_defaut()
+
+
+def normaliser_requete(query):
+    return " ".join(str(query).lower().split())
+
+
+def cle_requete(source, query, params):
+    brut = json.dumps([source, normaliser_requete(query), params], sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha1(brut.encode("utf-8")).hexdigest()
+
+
+# 🎯 Décorateur : clé = source + requête normalisée + paramètres (hors secrets comme api_key)
+def en_cache(source, ignorer=("api_key",), cache=None):
+    def decorateur(fonction):
+        signature = inspect.signature(fonction)
+
+        @functools.wraps(fonction)
+        def enveloppe(*args, **kwargs):
+            cible = cache or cache_requetes
+            appel = signature.bind(*args, **kwargs)
+            appel.apply_defaults()
+            params = {k: v for k, v in appel.arguments.items() if k not in ignorer}
+            query = params.pop("query", "")
+            cle = cle_requete(source, query, params)
+
+            trouve, valeur = cible.get(cle)
+            if trouve:
+                return valeur
+            valeur = fonction(*args, **kwargs)
+            if getattr(valeur, "perime", False):
+                return valeur  # résultat de repli (API indisponible) : jamais pris pour une réponse fraîche
+            cible.set(cle, valeur, TTL_PAR_SOURCE.get(source, 600) if valeur else TTL_VIDE)
+            return valeur
+
+        enveloppe.sans_cache = fonction
+        return enveloppe
+    return decorateur
@@ -0,0 +1,147 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict, namedtuple
+from datetime import date
+
+import pdf_worker
+from metrics import mesurer
+from regles import recommandations_rapport
+from store import store_partage
+from utils import get_insights_data, html_rapport, recherche_libre
+
+# 📦 Rapports pré-rendus, par combinaison de filtres.
+# Un paquet contient tout ce qu'affiche ou exporte la section rapport (insights, articles,
+# recommandations, markdown, HTML d'export ; le PDF est rangé par pdf_worker sous l'empreinte du
+# HTML). Il est indexé par (secteur, pays, entreprise, mot-clé) et daté de la version des données
+# de la base (toute ingestion, recherche libre comprise) : tant qu'aucune ingestion n'a eu lieu,
+# l'ouvrir n'est qu'une recherche en mémoire.
+# Une lecture « locale seulement » (section toujours affichée, préchauffage) n'interroge jamais
+# les API : sans résultat local, elle rend un paquet provisoire qui n'est pas mis en cache. Un
+# paquet dont le repli sur les API a échoué (origine « partiel ») est provisoire lui aussi.
+# Après une ingestion, ses entrées sont relues (recherche locale) et comparées par empreinte :
+# le paquet n'est ré-rendu que si elles ont réellement changé. Un thread de préchauffage
+# reconstruit les paquets récemment ouverts à chaque nouveau snapshot.
+
+MAX_PAQUETS = 128
+ARTICLES_PAR_RAPPORT = 3
+NEWS_PAR_RAPPORT = 2
+PRECALCUL_PDF = os.getenv("AGENTWATCH_PRECALCUL_PDF") == "1"  # rendre aussi les PDF au préchauffage
+
+Paquet = namedtuple("Paquet", [
+    "version", "jour", "empreinte", "insights", "note_pays", "note_entreprise",
+    "articles", "news", "origine", "recommandations", "markdown", "html",
+])
+
+_paquets = OrderedDict()  # (secteur, pays, entreprise, mot_cle) → Paquet, du moins au plus récemment lu
+_verrou = threading.Lock()
+_thread = None
+compteurs = {"hits": 0, "revalidations": 0, "rendus": 0, "echecs": 0}
+_journal = logging.getLogger(__name__)
+
+
+def _empreinte(jour, *entrees):
+    brut = json.dumps([jour, *entrees], ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha256(brut.encode("utf-8")).hexdigest()
+
+
+def _markdown(insights, note_pays, note_entreprise):
+    blocs = ["\n".join(f"- {i}" for i in insights)]
+    blocs += [note for note in (note_pays, note_entreprise) if note]
+    return "\n\n".join(blocs)
+
+
+def _ranger(cle, paquet, compteur):
+    with _verrou:
+        _paquets[cle] = paquet
+        _paquets.move_to_end(cle)
+        compteurs[compteur] += 1
+        while len(_paquets) > MAX_PAQUETS:
+            _paquets.popitem(last=False)
+
+
+@mesurer("paquet_rapport")
+def _construire(cle, api_key, local_seulement=False):
+    secteur, pays, entreprise, mot_cle = cle
+    jour = date.today().isoformat()  # le HTML d'export est daté
+    insights, note_pays, note_entreprise = get_insights_data(secteur, pays, entreprise)
+    articles, news, origine = recherche_libre(mot_cle, secteur, pays, entreprise, api_key,
+                                              ARTICLES_PAR_RAPPORT, NEWS_PAR_RAPPORT, local_seulement)
+    # Sans résultat local ou API en échec, le paquet reste provisoire : la prochaine génération
+    # pourra (ré)interroger les API
+    provisoire = origine == "partiel" or (local_seulement and not (articles or news))
+    # Lue après la recherche : un repli sur les API vient d'ingérer ses résultats
+    version = store_partage().version_donnees()
+    empreinte = _empreinte(jour, insights, note_pays, note_entreprise, articles, news)
+
+    with _verrou:
+        precedent = _paquets.get(cle)
+    if precedent is not None and precedent.empreinte == empreinte and not provisoire:
+        paquet = precedent._replace(version=version)
+        _ranger(cle, paquet, "revalidations")
+        return paquet
+
+    recommandations = recommandations_rapport(secteur, insights, articles, news)
+    paquet = Paquet(
+        version, jour, empreinte, tuple(insights), note_pays, note_entreprise, tuple(articles), tuple(news), origine,
+        tuple(recommandations), _markdown(insights, note_pays, note_entreprise),
+        html_rapport(secteur, pays, entreprise, insights, note_pays, note_entreprise, recommandations),
+    )
+    if provisoire:
+        return paquet
+    _ranger(cle, paquet, "rendus")
+    if PRECALCUL_PDF:
+        pdf_worker.soumettre(paquet.html)
+    return paquet
+
+
+# 🔎 Paquet des filtres courants : lecture en mémoire si les données n'ont pas changé depuis ;
+# `local_seulement` pour les affichages sans action de l'utilisateur (aucun appel aux API)
+def paquet_rapport(secteur, pays, entreprise, mot_cle, api_key, local_seulement=False):
+    cle = (secteur, pays, entreprise, mot_cle)
+    version = store_partage().version_donnees()
+    with _verrou:
+        paquet = _paquets.get(cle)
+        if paquet is not None and paquet.version == version and paquet.jour == date.today().isoformat():
+            _paquets.move_to_end(cle)
+            compteurs["hits"] += 1
+            return paquet
+    return _construire(cle, api_key, local_seulement)
+
+
+def prechauffer(cles, api_key):
+    for cle in cles:
+        try:
+            _construire(cle, api_key, local_seulement=True)
+        except Exception:  # un paquet en échec sera reconstruit à sa prochaine ouverture
+            with _verrou:
+                compteurs["echecs"] += 1
+            _journal.exception("Échec du préchauffage du rapport %s", cle)
+
+
+def _boucle(api_key, defauts):
+    import scheduler
+
+    version = 0
+    while True:
+        version = scheduler.attendre_version(version, None).version
+        with _verrou:
+            recents = list(reversed(_paquets))
+        prechauffer(dict.fromkeys(recents + list(defauts)), api_key)
+
+
+# ▶️ Démarrage idempotent du préchauffage (un thread par processus), déclenché par chaque snapshot
+def demarrer(api_key, defauts=()):
+    global _thread
+    with _verrou:
+        if _thread is not None:
+            return
+        _thread = threading.Thread(target=_boucle, args=(api_key, tuple(defauts)), daemon=True, name="prechauffage-rapports")
+        _thread.start()
+
+
+def statistiques():
+    with _verrou:
+        return dict(compteurs, paquets=len(_paquets))
@@ -0,0 +1,251 @@
+import argparse
+import json
+import os
+import random
+import tempfile
+import threading
+import time
+
+from replay import ServeurRejeu
+
+# 👥 Test de charge : N sessions d'analystes simultanées, hors ligne.
+# Arxiv, SerpAPI et Notion sont simulés par le serveur de rejeu ; chaque session est un AppTest
+# Streamlit exécuté dans son propre thread du même processus, comme les sessions d'un serveur
+# Streamlit. Parcours d'une session : ouverture, changement de filtres, génération du rapport,
+# export PDF, enregistrement Notion. Export et enregistrement passent par des files en
+# arrière-plan : leur durée court jusqu'à la fin du rendu PDF ou de l'envoi de la page, pas
+# seulement jusqu'au clic. Pour chaque palier de N : latences p50/p95/p99 par action, pic de
+# threads et de mémoire résidente, requêtes sortantes reçues par le serveur de rejeu (relevées
+# une fois la file Notion vidée).
+
+PALIERS = (1, 5, 10, 20)
+ACTIONS = ("ouverture", "filtres", "rapport", "export_pdf", "notion")
+SEUIL_P95 = 2.0  # secondes : au-delà, le palier est considéré comme saturé
+ECHANTILLONNAGE = 0.1
+
+
+def _centiles(durees):
+    durees = sorted(durees)
+    if not durees:
+        return {}
+
+    def centile(p):
+        return durees[min(len(durees) - 1, int(round(p * (len(durees) - 1))))]
+    return {"n": len(durees), "p50": centile(0.50), "p95": centile(0.95), "p99": centile(0.99), "max": durees[-1]}
+
+
+def _rss():
+    try:
+        with open("/proc/self/status", encoding="ascii") as f:
+            for ligne in f:
+                if ligne.startswith("VmRSS:"):
+                    return int(ligne.split()[1]) * 1024
+    except OSError:
+        pass
+    try:
+        import resource  # hors Linux : pic de RSS plutôt que valeur courante
+    except ImportError:  # Windows
+        return 0
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+# 📏 Relève threads et RSS pendant un palier (pics et valeurs de fin)
+class Echantillonneur:
+    def __init__(self):
+        self.threads = []
+        self.rss = []
+        self._arret = threading.Event()
+        self._thread = threading.Thread(target=self._boucle, daemon=True, name="echantillonneur-charge")
+
+    def _boucle(self):
+        while not self._arret.is_set():
+            self.threads.append(threading.active_count())
+            self.rss.append(_rss())
+            self._arret.wait(ECHANTILLONNAGE)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._arret.set()
+        self._thread.join()
+        self.threads.append(threading.active_count())
+        self.rss.append(_rss())
+
+
+# ⏳ Attend qu'une condition soit vraie, en la sondant ; TimeoutError au-delà du délai
+def _attendre(condition, timeout, quoi):
+    limite = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > limite:
+            raise TimeoutError(f"{quoi} non terminé après {timeout} s")
+        time.sleep(ECHANTILLONNAGE)
+
+
+def _session(graine, timeout, mesures, erreurs, verrou):
+    from streamlit.testing.v1 import AppTest
+
+    import notion_queue
+    import pdf_worker
+
+    hasard = random.Random(graine)
+    at = AppTest.from_file("app.py", default_timeout=timeout)
+    at.secrets["NOTION_TOKEN"] = "test-de-charge"
+    at.secrets["NOTION_DB_ID"] = "test-de-charge"
+
+    def filtres():
+        for selecteur in at.sidebar.selectbox:
+            selecteur.set_value(hasard.choice(selecteur.options))
+        return at.run()
+
+    # Le rendu tourne dans le pool de pdf_worker : mesuré jusqu'à ce que le PDF soit prêt (ou en erreur).
+    # Le travail suivi est celui que l'application a soumis pour cette session ; inconnu = échec
+    def export_pdf():
+        at.button(key="export_pdf_rapport").click().run()
+        if "dernier_export_pdf" not in at.session_state:
+            raise RuntimeError("aucun rendu PDF soumis")
+        cle = at.session_state["dernier_export_pdf"]
+
+        def fini():
+            travail = pdf_worker.etat(cle)
+            if travail is None:
+                raise RuntimeError(f"rendu PDF {cle[:12]} inconnu de pdf_worker")
+            return travail["etat"] in ("terminé", "erreur")
+        _attendre(fini, timeout, "rendu PDF")
+
+    # L'envoi passe par la file Notion : mesuré jusqu'à ce que la page soit envoyée (ou en erreur)
+    def notion():
+        at.button(key="notion_save_rapport").click().run()
+        if "dernier_export_notion" not in at.session_state:
+            raise RuntimeError("aucune page mise en file Notion")
+        cle = at.session_state["dernier_export_notion"]
+
+        def fini():
+            ligne = notion_queue.statut(cle)
+            if ligne is None:
+                raise RuntimeError(f"page Notion {cle[:12]} absente de la file")
+            return ligne["statut"] not in ("en attente", "en cours")
+        _attendre(fini, timeout, "envoi Notion")
+
+    parcours = (
+        ("ouverture", at.run),
+        ("filtres", filtres),
+        ("rapport", lambda: at.sidebar.button(key="generate_report").click().run()),
+        ("export_pdf", export_pdf),
+        ("notion", notion),
+    )
+    for action, etape in parcours:
+        debut = time.perf_counter()
+        try:
+            etape()
+            problemes = [str(e.value) for e in at.exception]
+        except Exception as e:  # une session en échec ne doit pas interrompre le palier
+            problemes = [f"{type(e).__name__}: {e}"]
+        duree = time.perf_counter() - debut
+        with verrou:
+            mesures[action].append(duree)
+            erreurs.extend(f"{action} : {p}" for p in problemes)
+        if problemes:
+            return
+
+
+def palier(n, serveur, timeout=120, graine=0):
+    import notion_queue
+
+    mesures = {action: [] for action in ACTIONS}
+    erreurs = []
+    verrou = threading.Lock()
+    avant = dict(serveur.compteurs)
+    debut = time.perf_counter()
+    with Echantillonneur() as echantillons:
+        sessions = [
+            threading.Thread(target=_session, args=(graine + i, timeout, mesures, erreurs, verrou), name=f"session-{i}")
+            for i in range(n)
+        ]
+        for session in sessions:
+            session.start()
+        for session in sessions:
+            session.join()
+        # Requêtes sortantes relevées après l'envoi des pages encore en file (session interrompue…)
+        try:
+            _attendre(lambda: notion_queue.en_attente() == 0, timeout, "vidage de la file Notion")
+        except TimeoutError as e:
+            erreurs.append(f"notion : {e}")
+    return {
+        "sessions": n,
+        "duree": time.perf_counter() - debut,
+        "latences": {action: _centiles(durees) for action, durees in mesures.items()},
+        "threads": {"max": max(echantillons.threads), "fin": echantillons.threads[-1]},
+        "rss": {"max": max(echantillons.rss), "fin": echantillons.rss[-1]},
+        "requetes_sortantes": {cle: serveur.compteurs[cle] - avant[cle] for cle in ("arxiv", "serpapi", "notion", "erreurs")},
+        "erreurs": sorted(set(erreurs)),
+    }
+
+
+def _sature(resultat, seuil):
+    return bool(resultat["erreurs"]) or any(c and c["p95"] > seuil for c in resultat["latences"].values())
+
+
+def mesurer(paliers=PALIERS, latence=0.2, gigue=0.05, taux_erreur=0.0, fixtures="fixtures", seuil=SEUIL_P95, timeout=120):
+    serveur = ServeurRejeu(fixtures, latence, gigue, taux_erreur).demarrer()
+    # Doit précéder tout import des modules de l'application : URL des API et dossier de données
+    os.environ.update(serveur.environnement())
+    os.environ["AGENTWATCH_DATA_DIR"] = tempfile.mkdtemp(prefix="agentwatch-charge-")
+    os.environ.setdefault("SERPAPI_KEY", "test-de-charge")
+
+    # Session de chauffe : premier snapshot et imports, hors mesure
+    palier(1, serveur, timeout, graine=-1)
+    resultats = []
+    for i, n in enumerate(paliers):
+        resultats.append(palier(n, serveur, timeout, graine=1000 * i))
+    serveur.arreter()
+    saturation = next((r["sessions"] for r in resultats if _sature(r, seuil)), None)
+    return {
+        "parametres": {"paliers": list(paliers), "latence": latence, "gigue": gigue, "taux_erreur": taux_erreur, "seuil_p95": seuil},
+        "paliers": resultats,
+        "saturation": saturation,
+    }
+
+
+def afficher(rapport):
+    for resultat in rapport["paliers"]:
+        sortant = resultat["requetes_sortantes"]
+        print(f"\n👥 {resultat['sessions']} session(s) — {resultat['duree']:.1f} s, "
+              f"threads max {resultat['threads']['max']} (fin {resultat['threads']['fin']}), "
+              f"RSS max {resultat['rss']['max'] / 2 ** 20:.0f} Mio (fin {resultat['rss']['fin'] / 2 ** 20:.0f} Mio)")
+        print(f"   Requêtes sortantes : arxiv {sortant['arxiv']}, serpapi {sortant['serpapi']}, "
+              f"notion {sortant['notion']}, en erreur {sortant['erreurs']}")
+        print(f"   {'Action':<14}{'n':>5}{'p50 (s)':>10}{'p95 (s)':>10}{'p99 (s)':>10}{'max (s)':>10}")
+        for action, c in resultat["latences"].items():
+            if not c:
+                print(f"   {action:<14}{'—':>5}")
+                continue
+            print(f"   {action:<14}{c['n']:>5}{c['p50']:>10.3f}{c['p95']:>10.3f}{c['p99']:>10.3f}{c['max']:>10.3f}")
+        for erreur in resultat["erreurs"]:
+            print(f"   ⚠️ {erreur}")
+    if rapport["saturation"]:
+        print(f"\n🚧 Saturation à partir de {rapport['saturation']} sessions "
+              f"(p95 > {rapport['parametres']['seuil_p95']} s ou erreurs)")
+    else:
+        print("\n✅ Aucun palier saturé")
+
+
+# ▶️ `python charge.py --paliers 1,5,10,20,50 --latence 0.3 --json charge.json`
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Test de charge hors ligne d'AgentWatch AI")
+    parser.add_argument("--paliers", default=",".join(map(str, PALIERS)), help="nombres de sessions simultanées")
+    parser.add_argument("--latence", type=float, default=0.2, help="latence simulée des API (s)")
+    parser.add_argument("--gigue", type=float, default=0.05)
+    parser.add_argument("--erreurs", type=float, default=0.0, help="taux d'erreurs simulées (0 à 1)")
+    parser.add_argument("--fixtures", default="fixtures")
+    parser.add_argument("--seuil", type=float, default=SEUIL_P95, help="p95 (s) au-delà duquel un palier est saturé")
+    parser.add_argument("--json", help="écrire aussi le rapport dans ce fichier")
+    args = parser.parse_args()
+
+    rapport = mesurer([int(n) for n in args.paliers.split(",")], args.latence, args.gigue, args.erreurs,
+                      args.fixtures, args.seuil)
+    afficher(rapport)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(rapport, f, ensure_ascii=False, indent=2)
@@ -0,0 +1,70 @@
+import hashlib
+import random
+import re
+from array import array
+from functools import lru_cache
+
+# 🧬 Détection des quasi-doublons (MinHash + index LSH par bandes).
+# Titre et résumé normalisés sont réduits à un ensemble de mots, lui-même résumé par une
+# signature MinHash de PERMUTATIONS entiers : la proportion de positions égales entre deux
+# signatures estime la similarité de Jaccard des deux ensembles. La signature est découpée en
+# BANDES ; deux articles ne sont comparés que s'ils partagent au moins une bande entière, ce qui
+# arrive presque sûrement au-delà de SEUIL_JACCARD et presque jamais pour des textes sans
+# rapport. Chaque nouvel article ne voit donc qu'une poignée de candidats : coût quasi linéaire.
+# (SimHash a été écarté : sur des titres de dix mots, sa distance de Hamming est trop bruitée.)
+
+PERMUTATIONS = 64
+BANDES = 16  # 4 lignes par bande : seuil de collision ≈ (1/16) ** (1/4) = 0.5
+SEUIL_JACCARD = 0.6
+PREMIER = (1 << 61) - 1
+
+MOTS_VIDES = frozenset(
+    "a an and are as at be by for from in is it its of on or the to with via new using "
+    "le la les un une des du de et en au aux pour par sur dans avec".split()
+)
+
+
+# Coefficients des permutations (a·h + b) mod PREMIER, tirés d'une graine fixe : les signatures
+# stockées restent comparables d'un processus et d'un redémarrage à l'autre
+_tirage = random.Random(20240101)
+_COEFFICIENTS = [(_tirage.randrange(1, PREMIER), _tirage.randrange(PREMIER)) for _ in range(PERMUTATIONS)]
+
+
+def mots(titre, resume=""):
+    return {
+        mot.rstrip("s")
+        for mot in re.findall(r"\w+", f"{titre} {resume}".lower())
+        if mot not in MOTS_VIDES
+    }
+
+
+# Les PERMUTATIONS hachages d'un mot (mis en cache : le vocabulaire se répète beaucoup)
+@lru_cache(maxsize=200_000)
+def _hachages(mot):
+    h = int.from_bytes(hashlib.blake2b(mot.encode("utf-8"), digest_size=8).digest(), "big")
+    return tuple((a * h + b) % PREMIER for a, b in _COEFFICIENTS)
+
+
+def signature(titre, resume=""):
+    ensemble = mots(titre, resume)
+    if not ensemble:
+        return (PREMIER,) * PERMUTATIONS
+    return tuple(map(min, zip(*map(_hachages, ensemble))))
+
+
+def bandes(sig):
+    lignes = PERMUTATIONS // BANDES
+    # hash() d'un tuple d'entiers ne dépend pas de PYTHONHASHSEED : stable d'un processus à l'autre
+    return [(b, hash(sig[b * lignes:(b + 1) * lignes])) for b in range(BANDES)]
+
+
+def similarite(a, b):
+    return sum(x == y for x, y in zip(a, b)) / PERMUTATIONS
+
+
+def vers_blob(sig):
+    return array("Q", sig).tobytes()
+
+
+def depuis_blob(blob):
+    return tuple(array("Q", blob))
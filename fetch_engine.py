@@ -0,0 +1,52 @@
+import threading
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, wait
+
+# ⚡ Moteur de collecte concurrente : toutes les requêtes mot-clé × source partent en même temps.
+# Chaque source a son propre pool borné (plafond de concurrence par source) et la collecte
+# entière respecte un délai global : ce qui n'est pas revenu à temps est laissé de côté.
+
+LIMITES_PAR_SOURCE = {"arxiv": 4, "news": 4}
+LIMITE_PAR_DEFAUT = 2
+DELAI_GLOBAL = 10  # secondes
+
+Tache = namedtuple("Tache", ["cle", "source", "fonction", "args", "kwargs"])
+
+_executeurs = {}
+_verrou = threading.Lock()
+
+
+def _executeur(source):
+    # Pools partagés par tout le processus : une session Streamlit n'en recrée pas à chaque rerun
+    with _verrou:
+        if source not in _executeurs:
+            _executeurs[source] = ThreadPoolExecutor(
+                max_workers=LIMITES_PAR_SOURCE.get(source, LIMITE_PAR_DEFAUT),
+                thread_name_prefix=f"collecte-{source}"
+            )
+        return _executeurs[source]
+
+
+# 🚀 Lance toutes les tâches et renvoie (resultats, manquants) :
+# `resultats` associe la clé de chaque tâche terminée à sa valeur, `manquants` liste
+# les clés en erreur ou hors délai pour que l'appelant affiche un résultat partiel.
+def collecter(taches, delai=DELAI_GLOBAL):
+    futures = {}
+    for tache in taches:
+        future = _executeur(tache.source).submit(tache.fonction, *tache.args, **tache.kwargs)
+        futures[future] = tache.cle
+
+    termines, en_retard = wait(futures, timeout=delai)
+
+    resultats, manquants = {}, []
+    for future in termines:
+        cle = futures[future]
+        try:
+            resultats[cle] = future.result()
+        except Exception:
+            manquants.append(cle)
+    for future in en_retard:
+        # Une requête déjà partie ne s'annule pas : elle finit en arrière-plan, sans bloquer l'UI
+        future.cancel()
+        manquants.append(futures[future])
+    return resultats, manquants
@@ -0,0 +1,95 @@
+import random
+import threading
+import time
+from collections import namedtuple
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# 🌐 Client HTTP partagé par tous les collecteurs (Arxiv, SerpAPI).
+# Une seule Session par processus : pool de connexions keep-alive, gzip, timeouts explicites
+# (connexion, lecture), nouvelles tentatives avec backoff exponentiel + gigue, et revalidation
+# ETag / If-Modified-Since : un fil inchangé revient en 304, sans corps à télécharger.
+
+TIMEOUT = (5, 30)  # connexion, lecture (secondes)
+TENTATIVES = 3
+BACKOFF = 0.5  # secondes, doublé à chaque tentative
+STATUTS_A_RETENTER = {429, 500, 502, 503, 504}
+TAILLE_POOL = 16
+ENTETES = {"User-Agent": "AgentWatchAI/1.0", "Accept-Encoding": "gzip, deflate"}
+
+_session = None
+_verrou = threading.Lock()
+Validateur = namedtuple("Validateur", ["etag", "last_modified", "contenu", "meta"])
+_validateurs = {}  # url → Validateur, le plus ancien évincé en premier
+MAX_VALIDATEURS = 256
+
+
+def session():
+    global _session
+    with _verrou:
+        if _session is None:
+            _session = requests.Session()
+            adaptateur = HTTPAdapter(pool_connections=TAILLE_POOL, pool_maxsize=TAILLE_POOL)
+            _session.mount("http://", adaptateur)
+            _session.mount("https://", adaptateur)
+            _session.headers.update(ENTETES)
+        return _session
+
+
+def _attendre(tentative):
+    delai = BACKOFF * (2 ** tentative)
+    time.sleep(random.uniform(0, delai))  # « full jitter » : les clients ne se resynchronisent pas
+
+
+# 🔁 GET avec timeouts et nouvelles tentatives (erreurs réseau et statuts transitoires).
+# `nouvelle_tentative` (facultatif) est appelé avant chaque nouvel essai : s'il refuse (budget
+# épuisé…), la dernière réponse est renvoyée, ou la dernière erreur réseau levée.
+def get(url, params=None, headers=None, stream=False, timeout=TIMEOUT, tentatives=TENTATIVES, nouvelle_tentative=None):
+    response, erreur = None, None
+    for tentative in range(tentatives):
+        if tentative:
+            _attendre(tentative - 1)
+            if nouvelle_tentative is not None and not nouvelle_tentative():
+                break
+        try:
+            response = session().get(url, params=params, headers=headers, stream=stream, timeout=timeout)
+        except (requests.ConnectionError, requests.Timeout) as e:
+            response, erreur = None, e
+            continue
+        erreur = None
+        if response.status_code in STATUTS_A_RETENTER and tentative < tentatives - 1:
+            response.close()
+            continue
+        return response
+    if erreur is not None:
+        raise erreur
+    return response
+
+
+# ♻️ Revalidation : validateurs (ETag / Last-Modified) et corps déjà reçu, par URL complète.
+# `meta` laisse l'appelant décrire ce que couvre le corps mémorisé (ex. lecture partielle).
+def validateur(url):
+    with _verrou:
+        return _validateurs.get(url)
+
+
+def entetes_conditionnels(connu):
+    headers = {}
+    if connu and connu.etag:
+        headers["If-None-Match"] = connu.etag
+    if connu and connu.last_modified:
+        headers["If-Modified-Since"] = connu.last_modified
+    return headers
+
+
+def memoriser(url, response, contenu, **meta):
+    etag = response.headers.get("ETag")
+    last_modified = response.headers.get("Last-Modified")
+    if not (etag or last_modified):
+        return
+    with _verrou:
+        _validateurs.pop(url, None)
+        if len(_validateurs) >= MAX_VALIDATEURS:
+            _validateurs.pop(next(iter(_validateurs)))
+        _validateurs[url] = Validateur(etag, last_modified, contenu, meta)
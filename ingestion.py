@@ -0,0 +1,27 @@
+import argparse
+import os
+
+import scheduler
+
+# 🛰️ Démon d'ingestion autonome.
+# Collecte Arxiv / Google News (search_arxiv_lot, get_google_news via le planificateur), classe les
+# tendances et publie le snapshot binaire que les processus Streamlit projettent en lecture seule.
+# Lancer l'application avec AGENTWATCH_INGESTION=externe pour qu'elle ne collecte plus elle-même :
+# une réponse lente d'Arxiv ou de SerpAPI ne bloque alors plus aucun rerun.
+
+# ▶️ `python ingestion.py` (tourne en continu) ; `--une-fois` pour une collecte complète puis sortie
+if __name__ == "__main__":
+    from dotenv import load_dotenv
+
+    parser = argparse.ArgumentParser(description="Démon d'ingestion AgentWatch AI")
+    parser.add_argument("--intervalle", type=int, default=scheduler.INTERVALLE, help="intervalle initial par mot-clé (s)")
+    parser.add_argument("--une-fois", action="store_true", help="une collecte complète, publication, puis sortie")
+    args = parser.parse_args()
+
+    load_dotenv()
+    if args.une_fois:
+        snapshot = scheduler.collecter_une_fois(os.getenv("SERPAPI_KEY"))
+        print(f"✅ Snapshot v{snapshot.version} publié dans {scheduler.FICHIER_SNAPSHOT}")
+    else:
+        print(f"🛰️ Ingestion démarrée, snapshot : {scheduler.FICHIER_SNAPSHOT}")
+        scheduler.executer(os.getenv("SERPAPI_KEY"), args.intervalle)
@@ -0,0 +1,146 @@
+import json
+import math
+import mmap
+import os
+import struct
+from collections.abc import Mapping
+
+from tendances import Tendance
+
+# 💾 Snapshot binaire des tendances, lu par projection mémoire (mmap) en lecture seule.
+# Le fichier est écrit une fois par le démon d'ingestion (ou le leader) puis remplacé
+# atomiquement : tous les processus de l'application projettent les mêmes pages du cache
+# système au lieu d'en garder chacun une copie, et ouvrir un snapshot ne coûte que la projection.
+#
+# Disposition (petit-boutiste) :
+#   en-tête   MAGIQUE, version (u64), genere_le (f64, NaN si absent), taille des métadonnées (u32)
+#   méta      JSON : manquants, prochaine_execution, secteurs [nom, premier enregistrement, nombre]
+#   colonnes  pour chaque champ de CHAMPS : décalages u32 (n + 1) puis octets UTF-8 concaténés
+# Les enregistrements d'un secteur sont contigus ; un secteur n'est décodé qu'à sa première lecture.
+
+MAGIQUE = b"AWSNAP01"
+ENTETE = struct.Struct("<8sQdI")
+CHAMPS = ("uid", "source", "keyword", "titre", "lien", "publie", "sources")
+
+
+def _aligner(taille):
+    return (taille + 7) & ~7
+
+
+def _sources_texte(sources):
+    return ";".join(f"{s}:{n}" for s, n in sources)
+
+
+def _sources_depuis(texte):
+    return [(s, int(n)) for s, n in (element.rsplit(":", 1) for element in texte.split(";") if element)]
+
+
+def ecrire(chemin, version, tendances, manquants=(), genere_le=None, prochaine_execution=None):
+    secteurs, enregistrements = [], []
+    for secteur, lignes in tendances.items():
+        secteurs.append([secteur, len(enregistrements), len(lignes)])
+        enregistrements.extend(lignes)
+
+    colonnes = []
+    for champ in CHAMPS:
+        valeurs = [
+            (_sources_texte(t.sources) if champ == "sources" else getattr(t, champ) or "").encode("utf-8")
+            for t in enregistrements
+        ]
+        decalages = [0]
+        for valeur in valeurs:
+            decalages.append(decalages[-1] + len(valeur))
+        donnees = struct.pack(f"<{len(decalages)}I", *decalages) + b"".join(valeurs)
+        colonnes.append(donnees + b"\0" * (_aligner(len(donnees)) - len(donnees)))
+
+    meta = json.dumps({
+        "manquants": [list(m) if isinstance(m, tuple) else m for m in manquants],
+        "prochaine_execution": prochaine_execution,
+        "secteurs": secteurs,
+        "colonnes": [len(c) for c in colonnes],
+    }, ensure_ascii=False).encode("utf-8")
+    meta += b" " * (_aligner(ENTETE.size + len(meta)) - ENTETE.size - len(meta))
+    entete = ENTETE.pack(MAGIQUE, version, math.nan if genere_le is None else genere_le, len(meta))
+
+    os.makedirs(os.path.dirname(chemin) or ".", exist_ok=True)
+    temporaire = f"{chemin}.{os.getpid()}.tmp"
+    with open(temporaire, "wb") as f:
+        f.write(entete)
+        f.write(meta)
+        for colonne in colonnes:
+            f.write(colonne)
+    # remplacement atomique : un lecteur projette l'ancien ou le nouveau fichier, jamais un fichier partiel
+    os.replace(temporaire, chemin)
+
+
+class _Colonne:
+    def __init__(self, vue, nombre):
+        self.decalages = vue[:4 * (nombre + 1)].cast("I")
+        self.donnees = vue[4 * (nombre + 1):]
+
+    def __getitem__(self, i):
+        return str(self.donnees[self.decalages[i]:self.decalages[i + 1]], "utf-8")
+
+
+class TendancesMappees(Mapping):
+    def __init__(self, vue, meta):
+        nombre = sum(n for _, _, n in meta["secteurs"])
+        self._secteurs = {nom: (debut, n) for nom, debut, n in meta["secteurs"]}
+        self._colonnes = {}
+        position = 0
+        for champ, taille in zip(CHAMPS, meta["colonnes"]):
+            self._colonnes[champ] = _Colonne(vue[position:position + taille], nombre)
+            position += taille
+        self._decodees = {}
+
+    def __getitem__(self, secteur):
+        if secteur not in self._decodees:
+            debut, nombre = self._secteurs[secteur]
+            c = self._colonnes
+            self._decodees[secteur] = tuple(
+                Tendance(c["uid"][i], c["source"][i], secteur, c["keyword"][i], c["titre"][i],
+                         c["lien"][i], c["publie"][i], _sources_depuis(c["sources"][i]))
+                for i in range(debut, debut + nombre)
+            )
+        return self._decodees[secteur]
+
+    def __iter__(self):
+        return iter(self._secteurs)
+
+    def __len__(self):
+        return len(self._secteurs)
+
+
+# 📖 Projette le fichier : (version, tendances, manquants, genere_le, prochaine_execution), ou None
+# si le fichier est absent ou illisible
+def ouvrir(chemin):
+    try:
+        with open(chemin, "rb") as f:
+            projection = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        return None
+    vue = memoryview(projection)
+    if len(vue) < ENTETE.size:
+        return None
+    magique, version, genere_le, taille_meta = ENTETE.unpack_from(vue)
+    if magique != MAGIQUE:
+        return None
+    meta = json.loads(bytes(vue[ENTETE.size:ENTETE.size + taille_meta]))
+    # les vues gardent la projection ouverte tant qu'un snapshot y fait référence
+    tendances = TendancesMappees(vue[ENTETE.size + taille_meta:], meta)
+    return (
+        version,
+        tendances,
+        [tuple(m) if isinstance(m, list) else m for m in meta["manquants"]],
+        None if math.isnan(genere_le) else genere_le,
+        meta["prochaine_execution"],
+    )
+
+
+# Identité du fichier courant : permet de ne re-projeter qu'après un remplacement
+def signature(chemin):
+    try:
+        etat = os.stat(chemin)
+    except OSError:
+        return None
+    return etat.st_ino, etat.st_mtime_ns, etat.st_size
@@ -0,0 +1,176 @@
+import functools
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# 📊 Instrumentation des chemins critiques (collecte, caches, rendus).
+# Activée par AGENTWATCH_METRICS=1 : chaque span enregistre sa durée dans un histogramme
+# et compte ses erreurs ; les collecteurs ajoutent les octets reçus. Désactivée, `mesurer`
+# renvoie la fonction telle quelle et `compter_octets` sort immédiatement : coût nul.
+# Export au format texte Prometheus : fichier (AGENTWATCH_METRICS_FILE) ou point d'accès local
+# (AGENTWATCH_METRICS_PORT → http://127.0.0.1:<port>/metrics).
+
+ACTIF = os.getenv("AGENTWATCH_METRICS") == "1"
+SEUILS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+PREFIXES_THREADS_COLLECTE = ("rafraichissement", "collecte")
+
+_verrou = threading.Lock()
+_histogrammes = {}  # (span, source) → [compteurs par seuil…, +Inf], somme, nombre
+_erreurs = {}
+_octets = {}
+_serveur = None
+
+
+def _observer(span, source, duree, erreur):
+    cle = (span, source)
+    with _verrou:
+        histogramme = _histogrammes.get(cle)
+        if histogramme is None:
+            histogramme = _histogrammes[cle] = {"seaux": [0] * (len(SEUILS) + 1), "somme": 0.0, "nombre": 0}
+        for i, seuil in enumerate(SEUILS):
+            if duree <= seuil:
+                histogramme["seaux"][i] += 1
+                break
+        else:
+            histogramme["seaux"][-1] += 1
+        histogramme["somme"] += duree
+        histogramme["nombre"] += 1
+        if erreur:
+            _erreurs[cle] = _erreurs.get(cle, 0) + 1
+
+
+# ⏱️ Décorateur de span : durée et erreurs de chaque appel, par nom et par source
+def mesurer(span, source=""):
+    def decorateur(fonction):
+        if not ACTIF:
+            return fonction
+
+        @functools.wraps(fonction)
+        def enveloppe(*args, **kwargs):
+            debut = time.perf_counter()
+            erreur = False
+            try:
+                return fonction(*args, **kwargs)
+            except BaseException:
+                erreur = True
+                raise
+            finally:
+                _observer(span, source, time.perf_counter() - debut, erreur)
+        return enveloppe
+    return decorateur
+
+
+def compter_octets(source, nombre):
+    if not ACTIF:
+        return
+    with _verrou:
+        _octets[source] = _octets.get(source, 0) + nombre
+
+
+def threads_collecte():
+    return sum(1 for t in threading.enumerate() if t.name.startswith(PREFIXES_THREADS_COLLECTE))
+
+
+def _cache():
+    from cache import cache_requetes
+    return cache_requetes.statistiques()
+
+
+# 🧾 Vue synthétique pour le panneau d'administration
+def resume():
+    with _verrou:
+        spans = [
+            {
+                "span": span,
+                "source": source,
+                "appels": h["nombre"],
+                "moyenne (ms)": round(1000 * h["somme"] / h["nombre"], 1) if h["nombre"] else 0,
+                "erreurs": _erreurs.get((span, source), 0),
+            }
+            for (span, source), h in sorted(_histogrammes.items())
+        ]
+        octets = dict(_octets)
+    cache = _cache()
+    total = cache["hits"] + cache["misses"]
+    return {
+        "spans": spans,
+        "octets": octets,
+        "cache": dict(cache, ratio=round(cache["hits"] / total, 3) if total else None),
+        "threads_collecte": threads_collecte(),
+    }
+
+
+def _etiquettes(**valeurs):
+    return "{" + ",".join(f'{k}="{v}"' for k, v in valeurs.items() if v != "") + "}"
+
+
+def exporter_prometheus():
+    lignes = [
+        "# HELP agentwatch_span_seconds Durée des spans instrumentés.",
+        "# TYPE agentwatch_span_seconds histogram",
+    ]
+    with _verrou:
+        for (span, source), h in sorted(_histogrammes.items()):
+            cumul = 0
+            for seuil, nombre in zip((*SEUILS, "+Inf"), h["seaux"]):
+                cumul += nombre
+                lignes.append(f"agentwatch_span_seconds_bucket{_etiquettes(span=span, source=source, le=seuil)} {cumul}")
+            lignes.append(f"agentwatch_span_seconds_sum{_etiquettes(span=span, source=source)} {h['somme']:.6f}")
+            lignes.append(f"agentwatch_span_seconds_count{_etiquettes(span=span, source=source)} {h['nombre']}")
+        lignes += ["# HELP agentwatch_span_errors_total Appels terminés par une exception.",
+                   "# TYPE agentwatch_span_errors_total counter"]
+        for (span, source), nombre in sorted(_erreurs.items()):
+            lignes.append(f"agentwatch_span_errors_total{_etiquettes(span=span, source=source)} {nombre}")
+        lignes += ["# HELP agentwatch_bytes_received_total Octets reçus des API externes.",
+                   "# TYPE agentwatch_bytes_received_total counter"]
+        for source, nombre in sorted(_octets.items()):
+            lignes.append(f"agentwatch_bytes_received_total{_etiquettes(source=source)} {nombre}")
+
+    cache = _cache()
+    lignes += [
+        "# TYPE agentwatch_cache_hits_total counter",
+        f"agentwatch_cache_hits_total {cache['hits']}",
+        "# TYPE agentwatch_cache_misses_total counter",
+        f"agentwatch_cache_misses_total {cache['misses']}",
+        "# TYPE agentwatch_cache_entries gauge",
+        f"agentwatch_cache_entries {cache['entrees']}",
+        "# TYPE agentwatch_cache_bytes gauge",
+        f"agentwatch_cache_bytes {cache['octets']}",
+        "# TYPE agentwatch_refresh_threads gauge",
+        f"agentwatch_refresh_threads {threads_collecte()}",
+    ]
+    return "\n".join(lignes) + "\n"
+
+
+def ecrire_fichier(chemin):
+    temporaire = f"{chemin}.tmp"
+    with open(temporaire, "w", encoding="utf-8") as f:
+        f.write(exporter_prometheus())
+    os.replace(temporaire, chemin)
+
+
+# 🌐 Point d'accès /metrics (un seul serveur par processus)
+def demarrer_serveur(port):
+    global _serveur
+    with _verrou:
+        if _serveur is not None:
+            return
+
+        class Gestionnaire(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path != "/metrics":
+                    self.send_error(404)
+                    return
+                corps = exporter_prometheus().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(corps)))
+                self.end_headers()
+                self.wfile.write(corps)
+
+            def log_message(self, *args):
+                pass
+
+        _serveur = ThreadingHTTPServer(("127.0.0.1", port), Gestionnaire)
+        threading.Thread(target=_serveur.serve_forever, daemon=True, name="metriques").start()
@@ -0,0 +1,218 @@
+import argparse
+import hashlib
+import json
+import logging
+import os
+import random
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from datetime import date, datetime
+
+from metrics import mesurer
+from quota import SeauAJetons
+
+# 🗃️ File d'export Notion persistante.
+# Les rapports à enregistrer sont d'abord écrits dans une table SQLite (clé d'idempotence :
+# empreinte du contenu du rapport et du jour, un double clic n'ajoute donc rien). Un seul thread
+# par processus vide la file avec un client Notion réutilisé, au rythme autorisé par l'API
+# (~3 requêtes/s) et avec un backoff sur les réponses 429.
+
+DOSSIER = os.getenv("AGENTWATCH_DATA_DIR", ".agentwatch")
+CHEMIN = os.path.join(DOSSIER, "notion.sqlite")
+NOTION_URL = os.getenv("AGENTWATCH_NOTION_URL", "https://api.notion.com")
+MAX_TENTATIVES = 5
+BACKOFF = 1.0  # secondes, doublé à chaque 429 consécutif
+PAUSE_ERREUR = 30  # secondes avant de reprendre la file après une erreur inattendue
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS notion_pages (
+    cle TEXT PRIMARY KEY,
+    titre TEXT NOT NULL,
+    contenu TEXT NOT NULL,
+    secteur TEXT NOT NULL,
+    pays TEXT NOT NULL,
+    entreprise TEXT NOT NULL,
+    cree_le TEXT NOT NULL,
+    statut TEXT NOT NULL DEFAULT 'en attente',
+    tentatives INTEGER NOT NULL DEFAULT 0,
+    page_id TEXT,
+    erreur TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_notion_statut ON notion_pages(statut, cree_le);
+"""
+
+limiteur = SeauAJetons(debit=3, capacite=3)
+_config = {"token": None, "db": None}
+_client = None
+_thread = None
+_reveil = threading.Event()
+_verrou = threading.Lock()
+_schema_pret = threading.Event()
+_journal = logging.getLogger(__name__)
+
+
+@contextmanager
+def _connexion():
+    os.makedirs(DOSSIER, exist_ok=True)
+    connexion = sqlite3.connect(CHEMIN, timeout=30)
+    try:
+        if not _schema_pret.is_set():
+            connexion.execute("PRAGMA journal_mode=WAL")
+            connexion.executescript(SCHEMA)
+            _schema_pret.set()
+        with connexion:
+            yield connexion
+    finally:
+        connexion.close()
+
+
+def cle_idempotence(titre, contenu, secteur, pays, entreprise):
+    brut = json.dumps([titre, contenu, secteur, pays, entreprise, date.today().isoformat()], ensure_ascii=False)
+    return hashlib.sha256(brut.encode("utf-8")).hexdigest()
+
+
+# ➕ Met un rapport en file ; renvoie (cle, nouveau) — `nouveau` est faux pour un doublon
+def mettre_en_file(titre, contenu, secteur, pays, entreprise):
+    cle = cle_idempotence(titre, contenu, secteur, pays, entreprise)
+    with _connexion() as connexion:
+        curseur = connexion.execute(
+            "INSERT OR IGNORE INTO notion_pages (cle, titre, contenu, secteur, pays, entreprise, cree_le) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (cle, titre, contenu, secteur, pays, entreprise, datetime.now().isoformat())
+        )
+    _reveil.set()
+    return cle, curseur.rowcount == 1
+
+
+def statut(cle):
+    with _connexion() as connexion:
+        ligne = connexion.execute("SELECT statut, page_id, erreur FROM notion_pages WHERE cle = ?", (cle,)).fetchone()
+    return dict(zip(("statut", "page_id", "erreur"), ligne)) if ligne else None
+
+
+# Pages pas encore traitées par l'exportateur (en file ou en cours d'envoi)
+def en_attente():
+    with _connexion() as connexion:
+        return connexion.execute("SELECT COUNT(*) FROM notion_pages WHERE statut IN ('en attente', 'en cours')").fetchone()[0]
+
+
+def _client_notion():
+    global _client
+    with _verrou:
+        if _client is None:
+            from notion_client import Client  # chargé seulement si l'on exporte vers Notion
+            _client = Client(auth=_config["token"], base_url=NOTION_URL)
+        return _client
+
+
+@mesurer("notion_pages_create", source="notion")
+def _creer_page(ligne):
+    _, titre, contenu, secteur, pays, entreprise, cree_le = ligne
+    return _client_notion().pages.create(
+        parent={"database_id": _config["db"]},
+        properties={
+            "Nom": {"title": [{"text": {"content": titre}}]},
+            "Secteur": {"rich_text": [{"text": {"content": secteur}}]},
+            "Pays": {"rich_text": [{"text": {"content": pays}}]},
+            "Entreprise": {"rich_text": [{"text": {"content": entreprise}}]},
+            "Date": {"date": {"start": cree_le}}
+        },
+        children=[{
+            "object": "block", "type": "paragraph",
+            "paragraph": {"text": [{"type": "text", "text": {"content": contenu}}]}
+        }]
+    )
+
+
+def _limite_atteinte(erreur):
+    return getattr(erreur, "status", None) == 429 or getattr(erreur, "code", None) == "rate_limited"
+
+
+# 🔁 Envoie toutes les pages en attente ; renvoie le nombre de pages créées
+def vider_file(inclure_erreurs=False):
+    # Mode lot : reprend aussi les erreurs et les pages restées « en cours » après un arrêt brutal
+    statuts = ("en attente", "erreur", "en cours") if inclure_erreurs else ("en attente",)
+    with _connexion() as connexion:
+        lignes = connexion.execute(
+            f"SELECT cle, titre, contenu, secteur, pays, entreprise, cree_le FROM notion_pages "
+            f"WHERE statut IN ({','.join('?' * len(statuts))}) ORDER BY cree_le",
+            statuts
+        ).fetchall()
+
+    envoyees = 0
+    refus_consecutifs = 0
+    for ligne in lignes:
+        cle = ligne[0]
+        # Réservation : une page déjà prise par un autre exportateur n'est pas envoyée deux fois
+        with _connexion() as connexion:
+            reservee = connexion.execute(
+                f"UPDATE notion_pages SET statut = 'en cours' WHERE cle = ? AND statut IN ({','.join('?' * len(statuts))})",
+                (cle, *statuts)
+            ).rowcount == 1
+        if not reservee:
+            continue
+        while True:
+            limiteur.prendre(attente=60)
+            try:
+                page = _creer_page(ligne)
+            except Exception as e:
+                if _limite_atteinte(e) and refus_consecutifs < MAX_TENTATIVES:
+                    refus_consecutifs += 1
+                    time.sleep(random.uniform(0, BACKOFF * 2 ** refus_consecutifs))
+                    continue
+                with _connexion() as connexion:
+                    connexion.execute(
+                        "UPDATE notion_pages SET statut = 'erreur', tentatives = tentatives + 1, erreur = ? WHERE cle = ?",
+                        (str(e), cle)
+                    )
+                break
+            refus_consecutifs = 0
+            envoyees += 1
+            with _connexion() as connexion:
+                connexion.execute(
+                    "UPDATE notion_pages SET statut = 'envoyé', tentatives = tentatives + 1, page_id = ?, erreur = NULL WHERE cle = ?",
+                    (page.get("id"), cle)
+                )
+            break
+    return envoyees
+
+
+def _boucle():
+    while True:
+        _reveil.wait()
+        _reveil.clear()
+        try:
+            vider_file()
+        except Exception:
+            # « database is locked »… : le thread d'export survit et reprend la file après une pause
+            _journal.exception("Échec de l'export Notion, nouvel essai dans %s s", PAUSE_ERREUR)
+            time.sleep(PAUSE_ERREUR)
+            _reveil.set()
+
+
+# ▶️ Démarrage idempotent du thread d'export (une seule instance par processus)
+def demarrer(token, db):
+    global _thread
+    with _verrou:
+        _config.update(token=token, db=db)
+        if _thread is None:
+            _thread = threading.Thread(target=_boucle, daemon=True, name="export-notion")
+            _thread.start()
+    _reveil.set()
+
+
+# 📦 Mode lot : `python notion_queue.py --tout` renvoie en une passe tous les rapports stockés
+# qui ne sont pas encore dans Notion (en attente ou en erreur)
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export des rapports AgentWatch AI vers Notion")
+    parser.add_argument("--tout", action="store_true", help="reprendre aussi les rapports en erreur ou interrompus")
+    args = parser.parse_args()
+
+    from dotenv import load_dotenv
+    load_dotenv()
+    _config.update(token=os.getenv("NOTION_TOKEN"), db=os.getenv("NOTION_DB_ID"))
+    if not _config["token"] or not _config["db"]:
+        raise SystemExit("⚠️ Clé API ou ID Notion manquant.")
+    print(f"✅ {vider_file(inclure_erreurs=args.tout)} page(s) créée(s) dans Notion")
@@ -0,0 +1,93 @@
+import hashlib
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from metrics import mesurer
+
+# 📤 Rendu PDF hors du script Streamlit.
+# Les rendus passent par un pool borné (au plus MAX_RENDUS processus wkhtmltopdf simultanés).
+# Chaque PDF est rangé sous l'empreinte SHA-256 de son HTML : un rapport identique est servi
+# instantanément depuis le disque, et deux sessions ne s'écrasent plus jamais leur fichier
+# (écriture dans un fichier temporaire unique, puis renommage atomique).
+
+MAX_RENDUS = 2
+DOSSIER = os.path.join(os.getenv("AGENTWATCH_DATA_DIR", ".agentwatch"), "pdf")
+MAX_TRAVAUX = 256
+
+_pool = ThreadPoolExecutor(max_workers=MAX_RENDUS, thread_name_prefix="rendu-pdf")
+_travaux = OrderedDict()  # empreinte → état du travail
+_verrou = threading.Lock()
+
+
+def empreinte(html):
+    return hashlib.sha256(html.encode("utf-8")).hexdigest()
+
+
+def chemin_pdf(cle):
+    return os.path.join(DOSSIER, f"{cle}.pdf")
+
+
+@mesurer("rendu_pdf")
+def _rendre(cle, html, travail):
+    travail.update(etat="en cours", progression=0.1)
+    temporaire = None
+    try:
+        import pdfkit  # wkhtmltopdf n'est chargé que par les sessions qui exportent
+
+        os.makedirs(DOSSIER, exist_ok=True)
+        descripteur, temporaire = tempfile.mkstemp(suffix=".pdf", dir=DOSSIER)
+        os.close(descripteur)
+        pdfkit.from_string(html, temporaire)
+        travail["progression"] = 0.9
+        os.replace(temporaire, chemin_pdf(cle))
+        travail.update(etat="terminé", progression=1.0, chemin=chemin_pdf(cle))
+    except Exception as e:  # pdfkit absent, encodage… : le travail doit finir en erreur, pas rester en cours
+        travail.update(etat="erreur", erreur=str(e))
+    finally:
+        if temporaire and os.path.exists(temporaire):
+            os.remove(temporaire)
+
+
+# ➕ Soumet un rendu et renvoie son identifiant (l'empreinte du HTML) ; un travail identique
+# déjà en file ou en cours est partagé plutôt que relancé
+def soumettre(html):
+    cle = empreinte(html)
+    with _verrou:
+        travail = _travaux.get(cle)
+        if travail and travail["etat"] != "erreur":
+            return cle
+        if os.path.exists(chemin_pdf(cle)):
+            _travaux[cle] = {"etat": "terminé", "progression": 1.0, "chemin": chemin_pdf(cle), "erreur": None}
+        else:
+            _travaux[cle] = {"etat": "en attente", "progression": 0.0, "chemin": None, "erreur": None}
+            _pool.submit(_rendre, cle, html, _travaux[cle])
+        while len(_travaux) > MAX_TRAVAUX:
+            _travaux.popitem(last=False)
+    return cle
+
+
+def etat(cle):
+    with _verrou:
+        travail = _travaux.get(cle)
+        if travail is None and os.path.exists(chemin_pdf(cle)):
+            return {"etat": "terminé", "progression": 1.0, "chemin": chemin_pdf(cle), "erreur": None}
+        return dict(travail) if travail else None
+
+
+def lire(cle):
+    with open(chemin_pdf(cle), "rb") as f:
+        return f.read()
+
+
+# 🖨️ Rendu synchrone (génération en lot) : même cache par empreinte, sans passer par le pool
+def rendre_maintenant(html):
+    cle = empreinte(html)
+    if not os.path.exists(chemin_pdf(cle)):
+        travail = {"etat": "en attente", "progression": 0.0, "chemin": None, "erreur": None}
+        _rendre(cle, html, travail)
+        if travail["etat"] == "erreur":
+            raise OSError(travail["erreur"])
+    return chemin_pdf(cle)
@@ -0,0 +1,155 @@
+import math
+import re
+import threading
+from collections import Counter
+
+import numpy as np
+
+from doublons import MOTS_VIDES
+
+# 🎯 Classement par pertinence TF-IDF des articles d'un secteur.
+# Chaque article (titre + résumé) est une ligne d'une matrice creuse au format CSR (indices des
+# termes, tf logarithmique, pointeurs de ligne). Vocabulaire et fréquences documentaires sont mis
+# à jour à chaque ingestion, sans reconstruction. Le score de tous les articles contre le profil
+# de chaque secteur (cosinus) est un seul produit matrice creuse × profils vectorisé par NumPy.
+
+PROFILS_SECTEURS = {
+    "Santé": ["health", "healthcare", "medical", "clinical", "patient", "hospital", "diagnosis", "disease"],
+    "Finance": ["finance", "financial", "bank", "banking", "investment", "trading", "fraud", "credit", "risk"],
+}
+POIDS_MOTS_CLES = 2.0  # les mots-clés de collecte pèsent plus que le vocabulaire générique du secteur
+TAILLE_LOT = 5000
+
+
+def tokeniser(texte):
+    return [mot.rstrip("s") for mot in re.findall(r"\w+", texte.lower()) if mot not in MOTS_VIDES and len(mot) > 1]
+
+
+class IndexTfIdf:
+    def __init__(self):
+        self.vocabulaire = {}
+        self.dernier_rowid = 0  # filigrane de synchronisation avec la base d'articles
+        self._df = np.zeros(4096, dtype=np.int64)
+        self._position = {}  # uid → ligne de la matrice
+        self._morceaux = []  # (indices, tf, longueurs) par lot ingéré, concaténés à la demande
+        self._csr = None
+        self._verrou = threading.Lock()
+
+    def __len__(self):
+        return len(self._position)
+
+    def _identifiant(self, terme):
+        identifiant = self.vocabulaire.get(terme)
+        if identifiant is None:
+            identifiant = self.vocabulaire[terme] = len(self.vocabulaire)
+            if identifiant >= len(self._df):
+                self._df = np.concatenate([self._df, np.zeros(len(self._df), dtype=np.int64)])
+        return identifiant
+
+    # ➕ Ajoute des documents (uid, texte) ; les uid déjà indexés sont ignorés
+    def ajouter(self, documents):
+        indices, tf, longueurs = [], [], []
+        with self._verrou:
+            for uid, texte in documents:
+                if uid in self._position:
+                    continue
+                compte = Counter(tokeniser(texte))
+                for terme, n in compte.items():
+                    indices.append(self._identifiant(terme))
+                    tf.append(1.0 + math.log(n))
+                longueurs.append(len(compte))
+                self._position[uid] = len(self._position)
+            if not longueurs:
+                return 0
+            indices = np.array(indices, dtype=np.int64)
+            np.add.at(self._df, indices, 1)
+            self._morceaux.append((indices, np.array(tf), np.array(longueurs, dtype=np.int64)))
+            self._csr = None
+        return len(longueurs)
+
+    # Rattrape les articles stockés depuis la dernière synchronisation
+    def synchroniser(self, store):
+        while True:
+            lignes = store.articles_depuis(self.dernier_rowid, TAILLE_LOT)
+            if not lignes:
+                return
+            self.ajouter((uid, f"{title} {summary}") for _, uid, title, summary in lignes)
+            self.dernier_rowid = lignes[-1][0]
+
+    def _matrice(self):
+        if self._csr is None:
+            indices = np.concatenate([m[0] for m in self._morceaux])
+            tf = np.concatenate([m[1] for m in self._morceaux])
+            longueurs = np.concatenate([m[2] for m in self._morceaux])
+            self._csr = (indices, tf, np.concatenate([[0], np.cumsum(longueurs)]))
+        return self._csr
+
+    # 📊 Scores cosinus TF-IDF de tous les documents contre chaque profil : matrice (documents × profils)
+    def scorer(self, profils):
+        with self._verrou:
+            if not self._position:
+                return np.zeros((0, len(profils)))
+            indices, tf, indptr = self._matrice()
+            n_termes = len(self.vocabulaire)
+            idf = np.log((1 + len(self._position)) / (1 + self._df[:n_termes])) + 1.0
+
+            matrice_profils = np.zeros((n_termes, len(profils)))
+            for colonne, termes in enumerate(profils):
+                for terme, poids in termes.items():
+                    identifiant = self.vocabulaire.get(terme)
+                    if identifiant is not None:
+                        matrice_profils[identifiant, colonne] += poids * idf[identifiant]
+            normes_profils = np.linalg.norm(matrice_profils, axis=0)
+            matrice_profils /= np.where(normes_profils > 0, normes_profils, 1.0)
+
+        poids = tf * idf[indices]
+        # reduceat sur les seules lignes non vides : leurs débuts sont strictement croissants et
+        # chaque segment s'arrête au début de la suivante ; les documents sans terme restent à zéro
+        non_vides = indptr[1:] > indptr[:-1]
+        debuts = indptr[:-1][non_vides]
+        normes = np.ones(len(non_vides))
+        produits = np.zeros((len(non_vides), len(profils)))
+        if len(debuts):
+            normes[non_vides] = np.sqrt(np.add.reduceat(poids * poids, debuts))
+            produits[non_vides] = np.add.reduceat(poids[:, None] * matrice_profils[indices], debuts, axis=0)
+        return produits / normes[:, None]
+
+    def lignes(self, uids):
+        return [self._position.get(uid) for uid in uids]
+
+
+# 🎯 Profil d'un secteur : mots-clés de collecte + vocabulaire du secteur, pondérés
+def profil(secteur, mots_cles=()):
+    termes = Counter()
+    for terme in PROFILS_SECTEURS.get(secteur, []):
+        for mot in tokeniser(terme):
+            termes[mot] += 1.0
+    for mot_cle in mots_cles:
+        for mot in tokeniser(mot_cle):
+            termes[mot] += POIDS_MOTS_CLES
+    return termes
+
+
+# 🏆 Les k candidats les plus pertinents pour le secteur (à égalité, le plus récent d'abord)
+def classer(index, secteur, mots_cles, candidats, k):
+    if not candidats:
+        return []
+    scores = index.scorer([profil(secteur, mots_cles)])[:, 0]
+    lignes = index.lignes([c["uid"] for c in candidats])
+    notes = np.array([scores[l] if l is not None else 0.0 for l in lignes])
+    recents = np.argsort([c["published"] for c in candidats])[::-1]
+    ordre = recents[np.argsort(-notes[recents], kind="stable")]
+    return [candidats[i] for i in ordre[:k]]
+
+
+_index = None
+_verrou = threading.Lock()
+
+
+def index_partage(store):
+    global _index
+    with _verrou:
+        if _index is None:
+            _index = IndexTfIdf()
+        _index.synchroniser(store)
+        return _index
@@ -0,0 +1,97 @@
+import json
+import os
+import threading
+import time
+
+# 🗓️ Planification des collectes par mot-clé et par source.
+# Pour chaque couple (source, mot-clé) on garde la date de la dernière collecte, le rendement
+# (nouveaux articles par collecte, moyenne lissée) et l'historique d'erreurs. Un couple n'est
+# collecté que lorsqu'il est dû : l'intervalle raccourcit pour les mots-clés actifs, s'allonge
+# pour les mots-clés calmes, et recule exponentiellement après des erreurs consécutives.
+
+DOSSIER = os.getenv("AGENTWATCH_DATA_DIR", ".agentwatch")
+FICHIER = os.path.join(DOSSIER, "planification.json")
+INTERVALLE_INITIAL = 24 * 3600
+INTERVALLE_MIN = 3600
+INTERVALLE_MAX = 7 * 24 * 3600
+LISSAGE = 0.5  # poids de la dernière collecte dans le rendement
+SEUIL_ACTIF = 3.0  # nouveaux articles par collecte au-delà desquels on accélère
+SEUIL_CALME = 0.5  # en deçà, on ralentit
+RETENTATIVE = 300  # premier délai après une erreur, doublé à chaque erreur consécutive
+
+
+def _cle(source, keyword):
+    return f"{source}:{keyword}"
+
+
+class Planificateur:
+    def __init__(self, chemin=FICHIER, intervalle=INTERVALLE_INITIAL):
+        self.chemin = chemin
+        self.intervalle = intervalle
+        self._verrou = threading.Lock()
+        try:
+            with open(chemin, encoding="utf-8") as f:
+                self._etat = json.load(f)
+        except (OSError, ValueError):
+            self._etat = {}
+
+    def _entree(self, source, keyword):
+        return self._etat.setdefault(_cle(source, keyword), {
+            "derniere_collecte": None,
+            "prochaine": 0,
+            "intervalle": self.intervalle,
+            "rendement": None,
+            "collectes": 0,
+            "erreurs_consecutives": 0,
+            "derniere_erreur": None,
+        })
+
+    # 📋 Couples (source, mot-clé) à collecter maintenant ; `tout` force une collecte complète
+    def dus(self, couples, maintenant=None, tout=False):
+        maintenant = maintenant or time.time()
+        with self._verrou:
+            return [(source, kw) for source, kw in couples if tout or self._entree(source, kw)["prochaine"] <= maintenant]
+
+    def succes(self, source, keyword, nouveaux, maintenant=None):
+        maintenant = maintenant or time.time()
+        with self._verrou:
+            entree = self._entree(source, keyword)
+            precedent = entree["rendement"]
+            entree["rendement"] = nouveaux if precedent is None else LISSAGE * nouveaux + (1 - LISSAGE) * precedent
+            if entree["rendement"] >= SEUIL_ACTIF:
+                entree["intervalle"] /= 2
+            elif entree["rendement"] < SEUIL_CALME:
+                entree["intervalle"] *= 2
+            entree["intervalle"] = min(INTERVALLE_MAX, max(INTERVALLE_MIN, entree["intervalle"]))
+            entree.update(
+                derniere_collecte=maintenant,
+                prochaine=maintenant + entree["intervalle"],
+                collectes=entree["collectes"] + 1,
+                erreurs_consecutives=0,
+            )
+
+    def echec(self, source, keyword, erreur="hors délai", maintenant=None):
+        maintenant = maintenant or time.time()
+        with self._verrou:
+            entree = self._entree(source, keyword)
+            entree["erreurs_consecutives"] += 1
+            entree["derniere_erreur"] = erreur
+            recul = RETENTATIVE * 2 ** (entree["erreurs_consecutives"] - 1)
+            entree["prochaine"] = maintenant + min(entree["intervalle"], recul)
+
+    def prochaine_echeance(self, couples):
+        with self._verrou:
+            return min((self._entree(source, kw)["prochaine"] for source, kw in couples), default=None)
+
+    def sauvegarder(self):
+        with self._verrou:
+            contenu = json.dumps(self._etat, ensure_ascii=False)
+        os.makedirs(os.path.dirname(self.chemin) or ".", exist_ok=True)
+        temporaire = f"{self.chemin}.{os.getpid()}.tmp"
+        with open(temporaire, "w", encoding="utf-8") as f:
+            f.write(contenu)
+        os.replace(temporaire, self.chemin)
+
+    def etat(self):
+        with self._verrou:
+            return {cle: dict(entree) for cle, entree in self._etat.items()}
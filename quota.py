@@ -0,0 +1,241 @@
+import functools
+import inspect
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import closing
+from concurrent.futures import Future
+from datetime import date
+
+from cache import cle_requete
+
+# 🚦 Protection du quota SerpAPI.
+# - coalescence (« single-flight ») : des requêtes identiques simultanées partagent un seul appel ;
+# - seau à jetons + budget journalier : on ne dépasse ni le débit ni le quota du jour. Le budget
+#   est tenu dans une base SQLite du dossier de données, partagée par tous les processus et
+#   conservée au redémarrage ; chaque nouvelle tentative HTTP (429, 5xx) y est aussi décomptée ;
+# - disjoncteur : après plusieurs erreurs d'affilée, on arrête d'appeler l'API un moment et on
+#   ressert le dernier résultat connu (périmé, marqué comme tel et jamais mis en cache).
+# Sans résultat connu, un refus ou une erreur lève ErreurSerpAPI : l'appelant distingue
+# « pas d'actualité » d'« API indisponible ».
+
+DEBIT = 1.0  # jetons par seconde
+CAPACITE = 16  # une actualisation complète (un appel par mot-clé suivi) passe d'une seule rafale
+ATTENTE_MAX = 2  # secondes d'attente maximale pour un jeton
+QUOTA_JOURNALIER = int(os.getenv("SERPAPI_QUOTA_JOURNALIER", "250"))
+DOSSIER = os.getenv("AGENTWATCH_DATA_DIR", ".agentwatch")
+CHEMIN_BUDGET = os.path.join(DOSSIER, "quota.sqlite")
+SEUIL_ECHECS = 3
+PAUSE_DISJONCTEUR = 60  # secondes
+MAX_PERIMES = 512
+
+
+class ErreurSerpAPI(Exception):
+    pass
+
+
+# Dernier résultat connu resservi à la place d'un appel refusé ou en erreur
+class ResultatPerime(list):
+    perime = True
+
+
+class SingleFlight:
+    def __init__(self):
+        self._en_cours = {}
+        self._verrou = threading.Lock()
+
+    def executer(self, cle, fonction):
+        with self._verrou:
+            appel = self._en_cours.get(cle)
+            meneur = appel is None
+            if meneur:
+                appel = self._en_cours[cle] = Future()
+        if not meneur:
+            return appel.result()
+        try:
+            resultat = fonction()
+            appel.set_result(resultat)
+            return resultat
+        except BaseException as e:
+            appel.set_exception(e)
+            raise
+        finally:
+            with self._verrou:
+                del self._en_cours[cle]
+
+
+# 📅 Budget de requêtes du jour, commun à tous les processus de la machine
+class BudgetJournalier:
+    def __init__(self, quota=QUOTA_JOURNALIER, chemin=CHEMIN_BUDGET):
+        self.quota = quota
+        self.chemin = chemin
+        self._schema_pret = threading.Event()
+
+    def _connexion(self):
+        os.makedirs(os.path.dirname(self.chemin) or ".", exist_ok=True)
+        connexion = sqlite3.connect(self.chemin, timeout=30)
+        if not self._schema_pret.is_set():
+            connexion.execute("PRAGMA journal_mode=WAL")
+            connexion.execute("CREATE TABLE IF NOT EXISTS budget (jour TEXT PRIMARY KEY, consommes INTEGER NOT NULL)")
+            self._schema_pret.set()
+        return connexion
+
+    # Décompte atomique (une seule écriture SQLite) : deux processus ne dépassent pas le quota ensemble
+    def consommer(self, n=1):
+        jour = date.today().isoformat()
+        with closing(self._connexion()) as connexion, connexion:
+            connexion.execute("DELETE FROM budget WHERE jour < ?", (jour,))
+            connexion.execute("INSERT OR IGNORE INTO budget (jour, consommes) VALUES (?, 0)", (jour,))
+            return connexion.execute(
+                "UPDATE budget SET consommes = consommes + ? WHERE jour = ? AND consommes + ? <= ?",
+                (n, jour, n, self.quota)
+            ).rowcount == 1
+
+    def restant(self):
+        with closing(self._connexion()) as connexion:
+            ligne = connexion.execute("SELECT consommes FROM budget WHERE jour = ?", (date.today().isoformat(),)).fetchone()
+        return max(0, self.quota - (ligne[0] if ligne else 0))
+
+
+class SeauAJetons:
+    def __init__(self, debit=DEBIT, capacite=CAPACITE, budget=None):
+        self.debit = debit
+        self.capacite = capacite
+        self.budget = budget
+        self._jetons = capacite
+        self._maj = time.monotonic()
+        self._verrou = threading.Lock()
+
+    def _remplir(self):
+        maintenant = time.monotonic()
+        self._jetons = min(self.capacite, self._jetons + (maintenant - self._maj) * self.debit)
+        self._maj = maintenant
+
+    def prendre(self, attente=ATTENTE_MAX):
+        echeance = time.monotonic() + attente
+        while True:
+            with self._verrou:
+                self._remplir()
+                if self._jetons >= 1:
+                    if self.budget is not None and not self.budget.consommer():
+                        return False
+                    self._jetons -= 1
+                    return True
+                manque = (1 - self._jetons) / self.debit
+            if time.monotonic() + manque > echeance:
+                return False
+            time.sleep(manque)
+
+
+class Disjoncteur:
+    def __init__(self, seuil=SEUIL_ECHECS, pause=PAUSE_DISJONCTEUR):
+        self.seuil = seuil
+        self.pause = pause
+        self._echecs = 0
+        self._ouvert_le = None
+        self._verrou = threading.Lock()
+
+    # Fermé : tout passe. Ouvert : rien ne passe pendant `pause`. Semi-ouvert : un essai passe.
+    def etat(self):
+        with self._verrou:
+            if self._ouvert_le is None:
+                return "fermé"
+            return "ouvert" if time.monotonic() - self._ouvert_le < self.pause else "semi-ouvert"
+
+    def autorise(self):
+        with self._verrou:
+            if self._ouvert_le is None:
+                return True
+            if time.monotonic() - self._ouvert_le >= self.pause:
+                self._ouvert_le = time.monotonic()  # un seul essai par pause
+                return True
+            return False
+
+    def succes(self):
+        with self._verrou:
+            self._echecs = 0
+            self._ouvert_le = None
+
+    def echec(self):
+        with self._verrou:
+            self._echecs += 1
+            if self._echecs >= self.seuil:
+                self._ouvert_le = time.monotonic()
+
+
+coalescence = SingleFlight()
+budget = BudgetJournalier()
+limiteur = SeauAJetons(budget=budget)
+disjoncteur = Disjoncteur()
+_perimes = OrderedDict()
+_verrou_perimes = threading.Lock()
+_compteurs = {"perimes_servis": 0, "refus_quota": 0}
+
+
+# Dernier résultat connu (marqué périmé) ; sans lui, l'échec remonte à l'appelant
+def _dernier_connu(cle, raison):
+    with _verrou_perimes:
+        resultat = _perimes.get(cle)
+    if resultat is None:
+        raise ErreurSerpAPI(raison)
+    _compteurs["perimes_servis"] += 1
+    return ResultatPerime(resultat)
+
+
+# Nouvelle tentative HTTP (429, 5xx) : SerpAPI la facture aussi, elle est donc décomptée du budget
+def autoriser_nouvelle_tentative():
+    if budget.consommer():
+        return True
+    _compteurs["refus_quota"] += 1
+    return False
+
+
+def _memoriser(cle, resultat):
+    with _verrou_perimes:
+        _perimes[cle] = resultat
+        _perimes.move_to_end(cle)
+        while len(_perimes) > MAX_PERIMES:
+            _perimes.popitem(last=False)
+
+
+# 🛡️ Décorateur pour get_google_news : la fonction décorée lève ErreurSerpAPI sur une réponse
+# en erreur ; l'appelant reçoit alors le dernier résultat connu (ResultatPerime), ou l'erreur
+def protege_serpapi(fonction):
+    signature = inspect.signature(fonction)
+
+    @functools.wraps(fonction)
+    def enveloppe(*args, **kwargs):
+        appel = signature.bind(*args, **kwargs)
+        appel.apply_defaults()
+        params = {k: v for k, v in appel.arguments.items() if k != "api_key"}
+        cle = cle_requete("news", params.pop("query", ""), params)
+
+        def executer():
+            if not disjoncteur.autorise():
+                return _dernier_connu(cle, "disjoncteur ouvert")
+            if not limiteur.prendre():
+                _compteurs["refus_quota"] += 1
+                return _dernier_connu(cle, "débit ou quota du jour atteint")
+            try:
+                resultat = fonction(*args, **kwargs)
+            except Exception as e:
+                disjoncteur.echec()
+                return _dernier_connu(cle, str(e))
+            disjoncteur.succes()
+            _memoriser(cle, resultat)
+            return resultat
+
+        return coalescence.executer(cle, executer)
+
+    return enveloppe
+
+
+def etat_serpapi():
+    return {
+        "budget_restant": budget.restant(),
+        "quota_journalier": budget.quota,
+        "disjoncteur": disjoncteur.etat(),
+        **_compteurs,
+    }
@@ -0,0 +1,177 @@
+import argparse
+import json
+import multiprocessing
+import os
+import re
+import shutil
+import time
+import unicodedata
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+
+# 🗂️ Génération en lot des rapports stratégiques, sans navigateur.
+# Les collectes (index local puis API si besoin) sont faites une seule fois par secteur dans le
+# processus principal, puis réparties vers chaque combinaison secteur × pays × entreprise, filtrées
+# localement. Le rendu (insights, recommandations, HTML, PDF) tourne dans un pool de processus.
+# Sortie : un PDF (ou HTML si wkhtmltopdf manque) par rapport et un manifest.json.
+
+MOT_CLE_PAR_DEFAUT = "autonomous AI agents"
+MAX_ARTICLES = 20
+MAX_NEWS = 20
+ARTICLES_PAR_RAPPORT = 3
+NEWS_PAR_RAPPORT = 2
+
+
+def _nom_fichier(secteur, pays, entreprise):
+    brut = f"rapport_ia_{secteur}_{pays}_{entreprise}"
+    ascii_ = unicodedata.normalize("NFKD", brut).encode("ascii", "ignore").decode("ascii")
+    return re.sub(r"[^A-Za-z0-9]+", "_", ascii_).strip("_")
+
+
+def _contient(element, alternatives):
+    texte = f"{element.get('title', '')} {element.get('summary', '')} {element.get('snippet', '')}".lower()
+    return any(re.search(rf"\b{re.escape(a.lower())}\b", texte) for a in alternatives)
+
+
+# Éléments du corpus du secteur qui citent le pays et l'entreprise ; sans correspondance, le rapport
+# garde le corpus du secteur (signalé dans le manifest)
+def _filtrer(elements, termes, limite):
+    retenus = [e for e in elements if all(_contient(e, alternatives) for alternatives in termes)]
+    return (retenus or elements)[:limite], bool(retenus) or not termes
+
+
+# 🧾 Un rapport ; exécuté dans un processus du pool, n'utilise que les données reçues
+def generer_rapport(tache):
+    from pdf_worker import rendre_maintenant
+    from regles import recommandations_rapport
+    from utils import get_insights_data, html_rapport
+
+    debut = time.perf_counter()
+    secteur, pays, entreprise = tache["secteur"], tache["pays"], tache["entreprise"]
+    insights, note_pays, note_entreprise = get_insights_data(secteur, pays, entreprise)
+    recommandations = recommandations_rapport(secteur, insights, tache["articles"], tache["news"])
+    html = html_rapport(secteur, pays, entreprise, insights, note_pays, note_entreprise, recommandations)
+
+    entree = {
+        "secteur": secteur, "pays": pays, "entreprise": entreprise,
+        "articles": len(tache["articles"]), "news": len(tache["news"]),
+        "filtre_exact": tache["filtre_exact"], "recommandations": recommandations,
+        "fichier": None, "erreur": None,
+    }
+    nom = _nom_fichier(secteur, pays, entreprise)
+    if tache["pdf"]:
+        try:
+            fichier = f"{nom}.pdf"
+            shutil.copyfile(rendre_maintenant(html), os.path.join(tache["sortie"], fichier))
+            entree["fichier"] = fichier
+        except (OSError, ImportError) as e:
+            entree["erreur"] = f"PDF indisponible ({e}) : rapport écrit en HTML"
+    if entree["fichier"] is None:
+        fichier = f"{nom}.html"
+        with open(os.path.join(tache["sortie"], fichier), "w", encoding="utf-8") as f:
+            f.write(html)
+        entree["fichier"] = fichier
+    entree["duree"] = round(time.perf_counter() - debut, 3)
+    return entree
+
+
+# 📡 Collecte partagée : une recherche par secteur, pour toutes les combinaisons de ce secteur
+def collecter_corpus(secteurs, mot_cle, api_key):
+    from fetch_engine import Tache, collecter
+    from utils import recherche_libre
+
+    taches = [
+        Tache(secteur, "arxiv", recherche_libre, (mot_cle, secteur, "Tous", "Toutes", api_key),
+              {"max_articles": MAX_ARTICLES, "max_news": MAX_NEWS})
+        for secteur in secteurs
+    ]
+    resultats, manquants = collecter(taches, delai=120)
+    corpus = {secteur: {"articles": articles, "news": news, "origine": origine}
+              for secteur, (articles, news, origine) in resultats.items()}
+    for secteur in manquants:
+        corpus[secteur] = {"articles": [], "news": [], "origine": "erreur"}
+    return corpus
+
+
+def generer_lot(secteurs, pays, entreprises, sortie, mot_cle=MOT_CLE_PAR_DEFAUT, processus=None, pdf=True, api_key=None):
+    from utils import TERMES_PAYS
+
+    debut = time.perf_counter()
+    os.makedirs(sortie, exist_ok=True)
+    corpus = collecter_corpus(secteurs, mot_cle, api_key)
+
+    taches = []
+    for secteur in secteurs:
+        for p in pays:
+            for entreprise in entreprises:
+                termes = ([TERMES_PAYS[p]] if p in TERMES_PAYS else []) + \
+                         ([[entreprise, entreprise.replace(" ", "")]] if entreprise != "Toutes" else [])
+                articles, exact_articles = _filtrer(corpus[secteur]["articles"], termes, ARTICLES_PAR_RAPPORT)
+                news, exact_news = _filtrer(corpus[secteur]["news"], termes, NEWS_PAR_RAPPORT)
+                taches.append({
+                    "secteur": secteur, "pays": p, "entreprise": entreprise,
+                    "articles": articles, "news": news, "filtre_exact": exact_articles or exact_news,
+                    "sortie": sortie, "pdf": pdf,
+                })
+
+    # spawn : les processus ne partagent ni connexion SQLite ni pool HTTP hérités du parent
+    entrees = []
+    contexte = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=processus, mp_context=contexte) as pool:
+        futures = {pool.submit(generer_rapport, tache): tache for tache in taches}
+        for future in as_completed(futures):
+            tache = futures[future]
+            try:
+                entrees.append(future.result())
+            except Exception as e:
+                entrees.append({"secteur": tache["secteur"], "pays": tache["pays"], "entreprise": tache["entreprise"],
+                                "fichier": None, "erreur": str(e)})
+
+    entrees.sort(key=lambda e: (e["secteur"], e["pays"], e["entreprise"]))
+    manifest = {
+        "genere_le": datetime.now().isoformat(timespec="seconds"),
+        "mot_cle": mot_cle,
+        "duree": round(time.perf_counter() - debut, 3),
+        "collectes": {secteur: c["origine"] for secteur, c in corpus.items()},
+        "rapports": entrees,
+    }
+    with open(os.path.join(sortie, "manifest.json"), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    return manifest
+
+
+def _liste(valeur, toutes):
+    if not valeur:
+        return list(toutes)
+    choix = [v.strip() for v in valeur.split(",") if v.strip()]
+    inconnues = [v for v in choix if v not in toutes]
+    if inconnues:
+        raise SystemExit(f"⚠️ Valeur(s) inconnue(s) : {', '.join(inconnues)} (possibles : {', '.join(toutes)})")
+    return choix
+
+
+# ▶️ `python rapports.py` : toutes les combinaisons ; `--secteurs Santé --entreprises Pfizer,OpenAI`
+# pour un sous-ensemble
+if __name__ == "__main__":
+    from dotenv import load_dotenv
+    from utils import ENTREPRISES, PAYS, SECTEURS
+
+    parser = argparse.ArgumentParser(description="Génération en lot des rapports AgentWatch AI")
+    parser.add_argument("--secteurs", help="liste séparée par des virgules (défaut : tous)")
+    parser.add_argument("--pays", help="liste séparée par des virgules (défaut : tous)")
+    parser.add_argument("--entreprises", help="liste séparée par des virgules (défaut : toutes)")
+    parser.add_argument("--mot-cle", default=MOT_CLE_PAR_DEFAUT)
+    parser.add_argument("--sortie", default=os.path.join("rapports", datetime.now().strftime("%Y-%m-%d")))
+    parser.add_argument("--processus", type=int, default=os.cpu_count())
+    parser.add_argument("--sans-pdf", action="store_true", help="écrire les rapports en HTML uniquement")
+    args = parser.parse_args()
+
+    load_dotenv()
+    manifest = generer_lot(
+        _liste(args.secteurs, SECTEURS), _liste(args.pays, PAYS), _liste(args.entreprises, ENTREPRISES),
+        args.sortie, args.mot_cle, args.processus, not args.sans_pdf, os.getenv("SERPAPI_KEY"),
+    )
+    erreurs = [r for r in manifest["rapports"] if r["erreur"]]
+    print(f"✅ {len(manifest['rapports'])} rapport(s) dans {args.sortie} en {manifest['duree']} s")
+    for rapport in erreurs:
+        print(f"⚠️ {rapport['secteur']} / {rapport['pays']} / {rapport['entreprise']} : {rapport['erreur']}")
@@ -0,0 +1,118 @@
+import re
+from collections import Counter
+
+# 🧠 Moteur de règles pour les recommandations Salesforce.
+# Les règles sont déclarées dans une table (secteur, champ, conditions, recommandation) :
+# `conditions` est une liste de groupes, chaque groupe est satisfait si l'un de ses termes
+# apparaît (OU), et tous les groupes doivent l'être (ET). Par champ, tous les termes sont
+# compilés une seule fois en une expression régulière combinée : un document est parcouru
+# en une passe, quel que soit le nombre de règles.
+
+REGLES = [
+    ("Santé", "insight", [["suivi", "tri"]], "Déployer un agent IA dans Salesforce HealthCloud."),
+    ("Finance", "insight", [["portefeuille"]], "Intégrer un assistant IA dans Financial Services Cloud."),
+    (None, "insight", [["fraude"]], "Utiliser Einstein GPT pour la détection intelligente de fraude."),
+    ("Santé", "summary", [["diagnostic"]], "Créer un outil IA pour l’aide au diagnostic dans Salesforce."),
+    ("Finance", "summary", [["forecast", "risk"]], "Ajouter un modèle prédictif de risque dans Financial Cloud."),
+    ("Finance", "summary", [["autonomous agent"]], "Explorer les agents autonomes pour l’automatisation des processus de scoring."),
+    ("Santé", "snippet", [["ai"], ["patient"]], "Développer un agent conversationnel patient dans HealthCloud."),
+    ("Finance", "snippet", [["investment"]], "Ajouter une IA de scoring d'investissement dans Salesforce."),
+]
+
+RECOMMANDATION_PAR_DEFAUT = "Explorer des cas d’intégration IA récents dans Salesforce."
+
+
+class MoteurRegles:
+    def __init__(self, regles):
+        self.regles = list(regles)
+        self._motifs = {}
+        self._par_champ = {}
+        termes_par_champ = {}
+        for rang, (secteur, champ, conditions, recommandation) in enumerate(self.regles):
+            termes = termes_par_champ.setdefault(champ, {})
+            groupes = [frozenset(termes.setdefault(t.lower(), f"t{len(termes)}") for t in groupe) for groupe in conditions]
+            self._par_champ.setdefault(champ, []).append((rang, secteur, groupes, recommandation))
+
+        # Un groupe nommé par terme : `lastgroup` indique directement quel terme a été trouvé.
+        # \b en tête : « ai » ne se déclenche plus dans « said », mais « risk » couvre « risks ».
+        for champ, termes in termes_par_champ.items():
+            alternatives = sorted(termes.items(), key=lambda t: -len(t[0]))
+            self._motifs[champ] = re.compile(
+                "|".join(f"(?P<{nom}>\\b{re.escape(terme)})" for terme, nom in alternatives),
+                re.IGNORECASE
+            )
+
+    # 📊 Évalue un lot de documents (champ, texte) ; renvoie [(recommandation, nb_documents)]
+    # dédoublonné, dans l'ordre de la table
+    def evaluer(self, secteur, documents):
+        scores = Counter()
+        for champ, texte in documents:
+            motif = self._motifs.get(champ)
+            if motif is None or not texte:
+                continue
+            trouves = {m.lastgroup for m in motif.finditer(texte)}
+            if not trouves:
+                continue
+            for rang, secteur_regle, groupes, _ in self._par_champ[champ]:
+                if secteur_regle in (None, secteur) and all(groupe & trouves for groupe in groupes):
+                    scores[rang] += 1
+        return [(self.regles[rang][3], scores[rang]) for rang in sorted(scores)]
+
+    def recommander(self, secteur, documents):
+        return [recommandation for recommandation, _ in self.evaluer(secteur, documents)]
+
+
+moteur = MoteurRegles(REGLES)
+
+
+# 🧠 Recommandations d'un rapport (interface et génération en lot), avec repli par défaut
+def recommandations_rapport(secteur, insights, articles, news):
+    return moteur.recommander(secteur, documents_rapport(insights, articles, news)) or [RECOMMANDATION_PAR_DEFAUT]
+
+
+# 📄 Documents d'un rapport : insights, résumés d'articles Arxiv et extraits d'actualités
+def documents_rapport(insights, articles, news):
+    for insight in insights:
+        yield "insight", insight
+    for article in articles:
+        yield "summary", article.get("summary", "")
+    for item in news:
+        yield "snippet", item.get("snippet", "")
+
+
+# 🤖 Types d'agents IA (statistiques) : même principe, une expression combinée pour tous les
+# types ; chaque article reçoit un seul type, le plus cité (à égalité, l'ordre de la table)
+TYPES_AGENTS = {
+    "Agent diagnostic": ["diagnos", "triage", "clinical decision", "radiolog", "patholog", "medical imaging"],
+    "NLP": ["language model", "llm", "nlp", "natural language", "chatbot", "conversational", "text"],
+    "Support client": ["customer", "client", "support", "assistant", "service desk", "patient care"],
+    "Investissement": ["investment", "investor", "portfolio", "trading", "asset management", "wealth"],
+    "Prévision": ["forecast", "predict", "risk", "fraud", "anomal", "early warning"],
+}
+TYPE_AUTRE = "Autre"
+
+
+class ClassifieurTypes:
+    def __init__(self, types):
+        self.types = list(types)
+        self._type_par_groupe = {}
+        alternatives = []
+        for rang, (type_agent, termes) in enumerate(types.items()):
+            for terme in termes:
+                nom = f"t{len(self._type_par_groupe)}"
+                self._type_par_groupe[nom] = rang
+                alternatives.append((terme.lower(), nom))
+        alternatives.sort(key=lambda t: -len(t[0]))
+        self._motif = re.compile(
+            "|".join(f"(?P<{nom}>\\b{re.escape(terme)})" for terme, nom in alternatives),
+            re.IGNORECASE
+        )
+
+    def type_principal(self, texte):
+        scores = Counter(self._type_par_groupe[m.lastgroup] for m in self._motif.finditer(texte or ""))
+        if not scores:
+            return TYPE_AUTRE
+        return self.types[min(scores, key=lambda rang: (-scores[rang], rang))]
+
+
+classifieur_types = ClassifieurTypes(TYPES_AGENTS)
@@ -0,0 +1,192 @@
+import argparse
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+import urllib.parse
+import urllib.request
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# 🎬 Enregistrement / rejeu des appels Arxiv et SerpAPI.
+# Un petit serveur HTTP local se substitue aux deux API (AGENTWATCH_ARXIV_URL et
+# AGENTWATCH_SERPAPI_URL pointent vers lui). En mode enregistrement il relaie vers les vraies API
+# et écrit chaque réponse dans un fichier de fixture ; en mode rejeu il resservit les fixtures,
+# avec une latence et un taux d'erreur configurables. Sans fixture, une réponse synthétique
+# plausible est générée : le banc de mesure tourne sans accès réseau ni clé d'API.
+# L'API Notion (AGENTWATCH_NOTION_URL) est toujours simulée : les écritures ne sont jamais relayées.
+
+DOSSIER_FIXTURES = "fixtures"
+AMONT = {"arxiv": "http://export.arxiv.org/api/query", "serpapi": "https://serpapi.com/search"}
+PARAMS_IGNORES = {"api_key"}
+
+
+def cle_fixture(source, query_string):
+    params = sorted((k, v) for k, v in urllib.parse.parse_qsl(query_string) if k not in PARAMS_IGNORES)
+    return hashlib.sha1(json.dumps([source, params]).encode("utf-8")).hexdigest()
+
+
+def chemin_fixture(dossier, source, cle):
+    return os.path.join(dossier, source, f"{cle}.json")
+
+
+# 🧪 Réponses synthétiques (aucune fixture enregistrée pour cette requête)
+def _arxiv_synthetique(params, n=None):
+    n = n or int(params.get("max_results", 5))
+    maintenant = datetime.utcnow()
+    requete = params.get("search_query", "autonomous AI agents").replace("all:", "").replace('"', "")
+    prefixe = hashlib.sha1(requete.encode("utf-8")).hexdigest()[:4]
+    entrees = []
+    for i in range(int(params.get("start", 0)), int(params.get("start", 0)) + n):
+        date = (maintenant - timedelta(hours=6 * i)).strftime("%Y-%m-%dT%H:%M:%SZ")
+        identifiant = f"http://arxiv.org/abs/{prefixe}.{i:05d}v1"
+        entrees.append(
+            f"<entry><id>{identifiant}</id><updated>{date}</updated>"
+            f"<published>{date}</published><title>Autonomous agents for {requete} #{i}</title>"
+            f"<summary>We study AI agents for diagnostic, risk forecast and patient care in {requete}.</summary>"
+            f"<link href=\"{identifiant}\" rel=\"alternate\" type=\"text/html\"/></entry>"
+        )
+    corps = "<?xml version=\"1.0\" encoding=\"UTF-8\"?><feed xmlns=\"http://www.w3.org/2005/Atom\">" + "".join(entrees) + "</feed>"
+    return 200, "application/atom+xml", corps.encode("utf-8")
+
+
+def _serpapi_synthetique(params):
+    q = params.get("q", "AI")
+    resultats = [
+        {"title": f"{q} : actualité {i}", "link": f"https://news.example.com/{urllib.parse.quote(q)}/{i}",
+         "snippet": f"AI investment and patient care news about {q}.", "date": f"{i + 1} hours ago"}
+        for i in range(int(params.get("num", 5)))
+    ]
+    return 200, "application/json", json.dumps({"news_results": resultats}).encode("utf-8")
+
+
+class ServeurRejeu:
+    def __init__(self, dossier=DOSSIER_FIXTURES, latence=0.0, gigue=0.0, taux_erreur=0.0, enregistrer=False, port=0):
+        self.dossier = dossier
+        self.latence = latence
+        self.gigue = gigue
+        self.taux_erreur = taux_erreur
+        self.enregistrer = enregistrer
+        self.compteurs = {"arxiv": 0, "serpapi": 0, "notion": 0, "erreurs": 0, "fixtures": 0, "synthetiques": 0}
+        self._verrou = threading.Lock()
+        serveur = self
+
+        class Gestionnaire(BaseHTTPRequestHandler):
+            def do_GET(self):
+                serveur._traiter(self)
+
+            def do_POST(self):
+                serveur._traiter_notion(self)
+
+            def log_message(self, *args):
+                pass
+
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", port), Gestionnaire)
+        self._thread = None
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self._httpd.server_port}"
+
+    # Variables d'environnement à définir avant d'importer utils / de lancer app.py
+    def environnement(self):
+        return {"AGENTWATCH_ARXIV_URL": f"{self.url}/arxiv?", "AGENTWATCH_SERPAPI_URL": f"{self.url}/serpapi",
+                "AGENTWATCH_NOTION_URL": f"{self.url}/notion"}
+
+    def demarrer(self):
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True, name="serveur-rejeu")
+        self._thread.start()
+        return self
+
+    def arreter(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def _compter(self, cle):
+        with self._verrou:
+            self.compteurs[cle] += 1
+
+    def _traiter(self, requete):
+        chemin, _, query_string = requete.path.partition("?")
+        source = chemin.strip("/")
+        if source not in AMONT:
+            requete.send_error(404)
+            return
+        self._compter(source)
+
+        if self.latence or self.gigue:
+            time.sleep(max(0.0, self.latence + random.uniform(-self.gigue, self.gigue)))
+        if self.taux_erreur and random.random() < self.taux_erreur:
+            self._compter("erreurs")
+            requete.send_error(429 if source == "serpapi" else 503)
+            return
+
+        statut, type_contenu, corps = self._reponse(source, query_string)
+        requete.send_response(statut)
+        requete.send_header("Content-Type", type_contenu)
+        requete.send_header("Content-Length", str(len(corps)))
+        requete.end_headers()
+        requete.wfile.write(corps)
+
+    # 🗃️ Notion simulé : toute création de page réussit (après la latence et le taux d'erreur réglés)
+    def _traiter_notion(self, requete):
+        requete.rfile.read(int(requete.headers.get("Content-Length", 0)))
+        if not requete.path.startswith("/notion/"):
+            requete.send_error(404)
+            return
+        self._compter("notion")
+        if self.latence or self.gigue:
+            time.sleep(max(0.0, self.latence + random.uniform(-self.gigue, self.gigue)))
+        if self.taux_erreur and random.random() < self.taux_erreur:
+            self._compter("erreurs")
+            requete.send_error(429)
+            return
+        corps = json.dumps({"object": "page", "id": hashlib.sha1(os.urandom(8)).hexdigest()}).encode("utf-8")
+        requete.send_response(200)
+        requete.send_header("Content-Type", "application/json")
+        requete.send_header("Content-Length", str(len(corps)))
+        requete.end_headers()
+        requete.wfile.write(corps)
+
+    def _reponse(self, source, query_string):
+        chemin = chemin_fixture(self.dossier, source, cle_fixture(source, query_string))
+        if self.enregistrer:
+            with urllib.request.urlopen(f"{AMONT[source]}?{query_string}", timeout=30) as amont:
+                statut, type_contenu, corps = amont.status, amont.headers.get("Content-Type", ""), amont.read()
+            os.makedirs(os.path.dirname(chemin), exist_ok=True)
+            requete = urllib.parse.urlencode([(k, v) for k, v in urllib.parse.parse_qsl(query_string) if k not in PARAMS_IGNORES])
+            with open(chemin, "w", encoding="utf-8") as f:
+                json.dump({"requete": requete, "statut": statut, "type": type_contenu,
+                           "corps": corps.decode("utf-8")}, f, ensure_ascii=False)
+            return statut, type_contenu, corps
+        if os.path.exists(chemin):
+            self._compter("fixtures")
+            with open(chemin, encoding="utf-8") as f:
+                fixture = json.load(f)
+            return fixture["statut"], fixture["type"], fixture["corps"].encode("utf-8")
+        self._compter("synthetiques")
+        params = dict(urllib.parse.parse_qsl(query_string))
+        return _arxiv_synthetique(params) if source == "arxiv" else _serpapi_synthetique(params)
+
+
+# ▶️ `python replay.py --port 8765 --latence 0.3 --erreurs 0.05` puis lancer l'application avec
+# les variables affichées ; `--enregistrer` relaie vers les vraies API et écrit les fixtures
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serveur de rejeu Arxiv / SerpAPI pour AgentWatch AI")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--fixtures", default=DOSSIER_FIXTURES)
+    parser.add_argument("--latence", type=float, default=0.0, help="latence ajoutée par requête (s)")
+    parser.add_argument("--gigue", type=float, default=0.0, help="variation aléatoire de la latence (s)")
+    parser.add_argument("--erreurs", type=float, default=0.0, help="taux de réponses en erreur (0 à 1)")
+    parser.add_argument("--enregistrer", action="store_true", help="relayer vers les vraies API et enregistrer")
+    args = parser.parse_args()
+
+    serveur = ServeurRejeu(args.fixtures, args.latence, args.gigue, args.erreurs, args.enregistrer, args.port)
+    for nom, valeur in serveur.environnement().items():
+        print(f"export {nom}='{valeur}'")
+    try:
+        serveur._httpd.serve_forever()
+    except KeyboardInterrupt:
+        serveur.arreter()
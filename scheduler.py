@@ -0,0 +1,308 @@
+import logging
+import os
+import threading
+import time
+from collections import Counter, namedtuple
+from datetime import datetime
+from types import MappingProxyType
+
+import instantane
+from fetch_engine import Tache, collecter
+from metrics import mesurer
+from pertinence import classer, index_partage
+from planificateur import Planificateur
+from store import SANS_MOT_CLE, normaliser_arxiv, normaliser_news, store_partage
+from tendances import FilTendances, Tendance
+from utils import search_arxiv_lot, get_google_news, mots_cles
+
+try:
+    import fcntl
+except ImportError:  # Windows : pas de verrou inter-processus, chaque processus est son propre leader
+    fcntl = None
+
+# ⏰ Rafraîchisseur unique des tendances.
+# Un seul thread par processus (module importé une fois, quel que soit le nombre de reruns),
+# et un seul leader par machine grâce à un verrou fichier : le leader collecte et publie
+# un snapshot versionné sur disque, les autres processus se contentent de le projeter (instantane.py).
+# Le leader peut aussi être un démon séparé (ingestion.py) : l'application ne fait alors que lire.
+# Les sessions lisent le snapshot courant par référence : il est immuable, rien n'est copié.
+# Côté leader, le top de chaque secteur est reconstruit à chaque calcul dans un tampon borné de
+# tendances compactes.
+
+INTERVALLE = 24 * 3600  # intervalle initial d'un mot-clé, ajusté ensuite par le planificateur
+SONDAGE = 30  # secondes entre deux vérifications (échéance, demande manuelle, nouveau snapshot)
+DOSSIER = os.getenv("AGENTWATCH_DATA_DIR", ".agentwatch")
+FICHIER_SNAPSHOT = os.path.join(DOSSIER, "tendances.bin")
+FICHIER_VERROU = os.path.join(DOSSIER, "rafraichissement.lock")
+FICHIER_DEMANDE = os.path.join(DOSSIER, "rafraichissement.demande")
+MAX_PAR_MOT_CLE = 20  # plafond d'un delta ; la première collecte reste bornée à la fenêtre de 7 jours
+TENDANCES_PAR_SECTEUR = 8
+CANDIDATS_PAR_SECTEUR = 200  # articles récents du secteur soumis au classement par pertinence
+SOURCES = ("arxiv", "news")
+
+Snapshot = namedtuple("Snapshot", ["version", "tendances", "manquants", "genere_le"])
+
+_VIDE = Snapshot(0, MappingProxyType({"Santé": (), "Finance": ()}), (), None)
+
+_etat = {
+    "snapshot": _VIDE,
+    "leader": False,
+    "derniere_execution": None,
+    "prochaine_execution": None,
+    "derniere_erreur": None,
+}
+_verrou = threading.Lock()
+_nouveau_snapshot = threading.Condition(_verrou)
+_reveil = threading.Event()
+_planification = None
+_thread = None
+_fichier_verrou = None
+_signature_lue = None  # identité du dernier fichier snapshot projeté
+_journal = logging.getLogger(__name__)
+
+
+def _planificateur(intervalle=INTERVALLE):
+    global _planification
+    with _verrou:
+        if _planification is None:
+            _planification = Planificateur(intervalle=intervalle)
+        return _planification
+
+
+def _couples():
+    return [(source, kw) for keywords in mots_cles().values() for kw in keywords for source in SOURCES]
+
+
+# 📡 Collecte incrémentale : seuls les couples mot-clé × source dus selon le planificateur sont
+# demandés (et seulement les articles plus récents que le dernier stocké) ; `tout` force une
+# collecte complète. Les secteurs sans nouvel article gardent leur entrée du snapshot précédent.
+@mesurer("calculer_tendances")
+def calculer_tendances(api_key, tout=False):
+    store = store_partage()
+    planificateur = _planificateur()
+    dus = set(planificateur.dus(_couples(), tout=tout))
+    taches = []
+    arxiv_dus = {}
+    for secteur, keywords in mots_cles().items():
+        # Arxiv : une requête groupée (paginée) par secteur, limitée à ses mots-clés dus
+        arxiv_dus[secteur] = [kw for kw in keywords if ("arxiv", kw) in dus]
+        if arxiv_dus[secteur]:
+            depuis_arxiv = {kw: store.dernier_horodatage(kw, "arxiv") for kw in arxiv_dus[secteur]}
+            taches.append(Tache((secteur, None, "arxiv"), "arxiv", search_arxiv_lot, (arxiv_dus[secteur],), {"max_results": MAX_PAR_MOT_CLE * len(arxiv_dus[secteur]), "depuis": depuis_arxiv}))
+        for kw in keywords:
+            if ("news", kw) not in dus:
+                continue
+            depuis_news = store.dernier_horodatage(kw, "news")
+            taches.append(Tache((secteur, kw, "news"), "news", get_google_news, (kw, api_key), {"max_results": MAX_PAR_MOT_CLE, "depuis": depuis_news}))
+
+    resultats, manquants = collecter(taches) if taches else ({}, [])
+
+    # Rendement d'un mot-clé : articles qui lui sont nouvellement rattachés (un lot Arxiv partage
+    # ses articles entre mots-clés : chacun est crédité de ceux qu'il retrouve)
+    nouveaux = Counter()
+    for (secteur, kw, source), elements in resultats.items():
+        if getattr(elements, "perime", False):
+            # API refusée ou en erreur : repli sur le dernier résultat connu, compté comme un échec
+            planificateur.echec(source, kw, "résultat périmé")
+        elif source == "arxiv":
+            rendements = Counter()
+            for kw_article, articles in elements.items():
+                n = store.ingerer(secteur, kw_article or SANS_MOT_CLE, [normaliser_arxiv(a) for a in articles])
+                rendements[kw_article] += n
+                nouveaux[secteur] += n
+            for kw_du in arxiv_dus[secteur]:
+                planificateur.succes("arxiv", kw_du, rendements[kw_du])
+        else:
+            n = store.ingerer(secteur, kw, [normaliser_news(e) for e in elements])
+            nouveaux[secteur] += n
+            planificateur.succes("news", kw, n)
+    for secteur, kw, source in manquants:
+        for kw_echec in (arxiv_dus[secteur] if kw is None else [kw]):
+            planificateur.echec(source, kw_echec, "erreur ou hors délai")
+    planificateur.sauvegarder()
+
+    # Les tendances sont les plus pertinentes (TF-IDF contre le profil du secteur) parmi les
+    # CANDIDATS_PAR_SECTEUR articles les plus récents, et non plus simplement les derniers
+    precedentes = _etat["snapshot"].tendances
+    index = None
+    tendances = {}
+    for secteur, keywords in mots_cles().items():
+        if not nouveaux[secteur] and precedentes.get(secteur):
+            tendances[secteur] = precedentes[secteur]
+            continue
+        index = index or index_partage(store)
+        candidats = store.derniers_articles(secteur, limite=CANDIDATS_PAR_SECTEUR)
+        retenus = classer(index, secteur, keywords, candidats, TENDANCES_PAR_SECTEUR)
+        # Tampon neuf à chaque calcul : il contient exactement le top courant (un article sorti du
+        # classement disparaît, un article remonté n'est pas évincé pour son ancienneté)
+        fil = FilTendances(TENDANCES_PAR_SECTEUR)
+        for article in retenus:
+            fil.ajouter(Tendance.depuis_article(secteur, article))
+        tendances[secteur] = fil.figer()
+    return tendances, manquants
+
+
+def _figer(version, tendances, manquants, genere_le):
+    return Snapshot(
+        version,
+        MappingProxyType({secteur: tuple(lignes) for secteur, lignes in tendances.items()}),
+        tuple(tuple(m) if isinstance(m, list) else m for m in manquants),
+        genere_le
+    )
+
+
+def _publier(snapshot):
+    with _nouveau_snapshot:
+        _etat["snapshot"] = snapshot
+        _nouveau_snapshot.notify_all()
+
+
+def _ecrire_snapshot(snapshot, prochaine_execution):
+    instantane.ecrire(FICHIER_SNAPSHOT, snapshot.version, snapshot.tendances, snapshot.manquants,
+                      snapshot.genere_le, prochaine_execution)
+
+
+# Projette le snapshot sur disque, seulement s'il a été remplacé depuis la dernière lecture
+def _lire_snapshot():
+    global _signature_lue
+    signature = instantane.signature(FICHIER_SNAPSHOT)
+    if signature is None or signature == _signature_lue:
+        return None, None
+    contenu = instantane.ouvrir(FICHIER_SNAPSHOT)
+    if contenu is None:
+        return None, None
+    _signature_lue = signature
+    version, tendances, manquants, genere_le, prochaine_execution = contenu
+    return Snapshot(version, tendances, tuple(manquants), genere_le), prochaine_execution
+
+
+def _prendre_leadership():
+    global _fichier_verrou
+    if fcntl is None:
+        return True
+    os.makedirs(DOSSIER, exist_ok=True)
+    fichier = open(FICHIER_VERROU, "a")
+    try:
+        fcntl.flock(fichier, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        fichier.close()
+        return False
+    _fichier_verrou = fichier  # gardé ouvert : le verrou tombe avec le processus
+    return True
+
+
+def _rafraichir(api_key, tout=False):
+    try:
+        tendances, manquants = calculer_tendances(api_key, tout=tout)
+    except Exception as e:
+        _etat["derniere_erreur"] = f"{datetime.now().isoformat(timespec='seconds')} – {e}"
+        _etat["prochaine_execution"] = time.time() + SONDAGE
+        return
+    maintenant = time.time()
+    snapshot = _figer(_etat["snapshot"].version + 1, tendances, manquants, maintenant)
+    _etat["derniere_execution"] = maintenant
+    _etat["prochaine_execution"] = _planificateur().prochaine_echeance(_couples()) or maintenant + SONDAGE
+    _ecrire_snapshot(snapshot, _etat["prochaine_execution"])
+    _publier(snapshot)
+    _etat["derniere_erreur"] = None
+
+
+def _recharger():
+    snapshot, prochaine_execution = _lire_snapshot()
+    if snapshot is not None and snapshot.version > _etat["snapshot"].version:
+        _etat["derniere_execution"] = snapshot.genere_le
+        _etat["prochaine_execution"] = prochaine_execution
+        _publier(snapshot)
+
+
+def _boucle(api_key, intervalle, collecte=True):
+    # Reprise d'un snapshot existant : un redémarrage ne relance pas toute la collecte
+    try:
+        _recharger()
+        if collecte:
+            _etat["prochaine_execution"] = _planificateur(intervalle).prochaine_echeance(_couples())
+    except Exception:
+        _journal.exception("Reprise du snapshot impossible, collecte au prochain passage")
+
+    while True:
+        reveille = _reveil.is_set()
+        _reveil.clear()
+        try:
+            if collecte and not _etat["leader"]:
+                _etat["leader"] = _prendre_leadership()
+
+            if _etat["leader"]:
+                demande = os.path.exists(FICHIER_DEMANDE)
+                # Sans snapshot (première exécution) les tendances sont publiées tout de suite, depuis la base
+                # si aucun mot-clé n'est encore dû
+                if demande or reveille or _etat["snapshot"].version == 0 or time.time() >= (_etat["prochaine_execution"] or 0):
+                    if demande:
+                        os.remove(FICHIER_DEMANDE)
+                    _rafraichir(api_key, tout=demande or reveille)
+            else:
+                _recharger()
+        except Exception as e:
+            # Disque plein, droits… : le seul thread de rafraîchissement survit et réessaie au prochain sondage
+            _journal.exception("Échec du rafraîchissement des tendances, nouvel essai dans %s s", SONDAGE)
+            _etat["derniere_erreur"] = f"{datetime.now().isoformat(timespec='seconds')} – {e}"
+            _etat["prochaine_execution"] = time.time() + SONDAGE
+
+        _reveil.wait(SONDAGE)
+
+
+# ▶️ Démarrage idempotent : les reruns Streamlit suivants ne créent ni thread ni job supplémentaire.
+# `collecte=False` : le processus ne devient jamais leader et se contente de relire le snapshot
+# publié par le démon d'ingestion
+def demarrer(api_key, intervalle=INTERVALLE, collecte=True):
+    global _thread
+    with _verrou:
+        if _thread is not None:
+            return
+        _thread = threading.Thread(target=_boucle, args=(api_key, intervalle, collecte), daemon=True, name="rafraichissement-tendances")
+        _thread.start()
+
+
+# 🛰️ Boucle de collecte au premier plan (démon d'ingestion) ; attend le verrou si un leader tourne déjà
+def executer(api_key, intervalle=INTERVALLE):
+    _boucle(api_key, intervalle)
+
+
+# Collecte complète unique, publiée à la suite du snapshot existant
+def collecter_une_fois(api_key):
+    _recharger()
+    _rafraichir(api_key, tout=True)
+    if _etat["derniere_erreur"]:
+        raise RuntimeError(_etat["derniere_erreur"])
+    return _etat["snapshot"]
+
+
+# 🔄 Demande manuelle : réveille le leader local, ou le leader d'un autre processus via le fichier de demande
+def demander_rafraichissement():
+    if not _etat["leader"]:
+        os.makedirs(DOSSIER, exist_ok=True)
+        open(FICHIER_DEMANDE, "a").close()
+    _reveil.set()
+
+
+def snapshot_courant(attente=0):
+    with _nouveau_snapshot:
+        if _etat["snapshot"].version == 0 and attente:
+            _nouveau_snapshot.wait_for(lambda: _etat["snapshot"].version > 0, timeout=attente)
+        return _etat["snapshot"]
+
+
+def attendre_version(version, attente):
+    with _nouveau_snapshot:
+        _nouveau_snapshot.wait_for(lambda: _etat["snapshot"].version > version, timeout=attente)
+        return _etat["snapshot"]
+
+
+def statut():
+    return {
+        "leader": _etat["leader"],
+        "version": _etat["snapshot"].version,
+        "derniere_execution": _etat["derniere_execution"],
+        "prochaine_execution": _etat["prochaine_execution"],
+        "derniere_erreur": _etat["derniere_erreur"],
+        "collectes_en_echec": sorted(cle for cle, e in _planificateur().etat().items() if e["erreurs_consecutives"]),
+    }
@@ -0,0 +1,77 @@
+import threading
+from collections import Counter
+
+from store import store_partage
+
+# 📈 Graphiques de tendances construits sur les agrégats de la base (voir store.py).
+# Les figures sont calculées une fois par version des statistiques, puis partagées par toutes
+# les sessions : leur coût ne dépend ni de la durée de l'historique ni du nombre de reruns.
+
+MOIS_MIN_SERIE_MENSUELLE = 3  # en dessous, la série est tracée par jour
+TOP_MOTS_CLES = 8  # par secteur
+
+_verrou = threading.Lock()
+_cache = {"version": None, "figures": None}
+
+
+def _serie(store):
+    lignes = store.statistiques("source", "mois")
+    axe = "Mois"
+    if len({periode for periode, *_ in lignes}) < MOIS_MIN_SERIE_MENSUELLE:
+        lignes = store.statistiques("source", "jour")
+        axe = "Jour"
+    totaux = Counter()
+    for periode, secteur, _, nombre in lignes:
+        totaux[(periode, secteur)] += nombre
+    points = sorted(totaux.items())
+    return axe, {
+        axe: [periode for (periode, _), _ in points],
+        "Secteur": [secteur for (_, secteur), _ in points],
+        "Articles": [nombre for _, nombre in points],
+    }
+
+
+def _repartition(store, dimension):
+    totaux = Counter()
+    for _, secteur, valeur, nombre in store.statistiques(dimension, "mois"):
+        totaux[(secteur, valeur)] += nombre
+    return totaux
+
+
+def construire_figures(store=None):
+    # plotly n'est chargé qu'au premier affichage d'un graphique
+    import plotly.express as px
+
+    store = store or store_partage()
+    axe, serie = _serie(store)
+    if not serie["Articles"]:
+        return None
+    evolution = px.line(serie, x=axe, y="Articles", color="Secteur", markers=True,
+                        title="Évolution des articles IA collectés")
+
+    types = Counter()
+    for (_, type_agent), nombre in _repartition(store, "type").items():
+        types[type_agent] += nombre
+    repartition = px.pie(names=list(types), values=list(types.values()),
+                         title="Répartition des types d’agents IA observés")
+
+    mots_cles = _repartition(store, "keyword")
+    top = []
+    for secteur in sorted({s for s, _ in mots_cles}):
+        top += sorted(((cle, n) for cle, n in mots_cles.items() if cle[0] == secteur), key=lambda x: -x[1])[:TOP_MOTS_CLES]
+    par_mot_cle = px.bar(
+        {"Mot-clé": [kw for (_, kw), _ in top], "Secteur": [s for (s, _), _ in top], "Articles": [n for _, n in top]},
+        x="Mot-clé", y="Articles", color="Secteur", title="Articles par mot-clé"
+    )
+    return evolution, repartition, par_mot_cle
+
+
+# 🧊 Figures de la version courante ; reconstruites seulement quand une ingestion a modifié les agrégats
+def figures_courantes(store=None):
+    store = store or store_partage()
+    version = store.version_statistiques()
+    with _verrou:
+        if _cache["version"] != version:
+            _cache["figures"] = construire_figures(store)
+            _cache["version"] = version
+        return _cache["figures"]
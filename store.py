@@ -0,0 +1,406 @@
+import os
+import re
+import sqlite3
+import threading
+from datetime import datetime, timedelta
+
+import doublons
+from regles import classifieur_types
+
+# 🗄️ Base locale d'articles (SQLite en mode WAL).
+# Chaque article Arxiv / Google News est normalisé puis stocké une seule fois (clé = id Arxiv
+# ou URL de l'actualité) ; la table article_mots_cles garde tous les secteurs et mots-clés
+# qui l'ont fait remonter. Le dernier horodatage par mot-clé et source pilote la collecte
+# incrémentale : on ne redemande que ce qui est plus récent.
+# Les quasi-doublons (même histoire reprise par plusieurs requêtes ou sources) sont regroupés
+# à l'ingestion sous un article canonique, le premier vu (voir doublons.py).
+# Un index plein texte FTS5 (titres, résumés, extraits) sert la recherche libre localement,
+# classée par BM25, sans appel réseau.
+# Les statistiques (par secteur, mot-clé et type d'agent) sont tenues en agrégats journaliers et
+# mensuels, incrémentés à l'insertion : les graphiques ne relisent jamais les articles bruts.
+
+DOSSIER = os.getenv("AGENTWATCH_DATA_DIR", ".agentwatch")
+CHEMIN = os.path.join(DOSSIER, "articles.sqlite")
+FORMAT_DATE = "%Y-%m-%dT%H:%M:%SZ"
+# Mot-clé des articles remontés par une recherche libre : indexés pour la recherche, mais absents
+# des statistiques et des candidats aux tendances (la requête saisie n'est pas un mot-clé suivi)
+MOT_CLE_RECHERCHE = "#recherche"
+# Article Arxiv du secteur qu'aucun mot-clé ne retrouve littéralement (lot racinisé) : compté dans
+# les totaux du secteur (source, type), mais pas comme un mot-clé
+SANS_MOT_CLE = "*"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS articles (
+    uid TEXT PRIMARY KEY,
+    source TEXT NOT NULL,
+    title TEXT NOT NULL,
+    summary TEXT NOT NULL DEFAULT '',
+    link TEXT NOT NULL DEFAULT '',
+    published TEXT NOT NULL,
+    collecte_le TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS article_mots_cles (
+    uid TEXT NOT NULL REFERENCES articles(uid),
+    secteur TEXT NOT NULL,
+    keyword TEXT NOT NULL,
+    PRIMARY KEY (uid, secteur, keyword)
+);
+CREATE INDEX IF NOT EXISTS idx_articles_published ON articles(published);
+CREATE INDEX IF NOT EXISTS idx_articles_source_published ON articles(source, published);
+CREATE INDEX IF NOT EXISTS idx_amc_secteur ON article_mots_cles(secteur, uid);
+CREATE INDEX IF NOT EXISTS idx_amc_keyword ON article_mots_cles(keyword, uid);
+CREATE TABLE IF NOT EXISTS article_bandes (
+    bande INTEGER NOT NULL,
+    valeur INTEGER NOT NULL,
+    uid TEXT NOT NULL REFERENCES articles(uid),
+    PRIMARY KEY (bande, valeur, uid)
+);
+CREATE TABLE IF NOT EXISTS compteurs (
+    nom TEXT PRIMARY KEY,
+    valeur INTEGER NOT NULL
+);
+"""
+
+# granularite : 'jour' (AAAA-MM-JJ) ou 'mois' (AAAA-MM) ; dimension : 'source' (total du secteur,
+# par source), 'keyword' ou 'type' — un article compte une fois par secteur, une fois par mot-clé
+SCHEMA_STATS = """
+CREATE TABLE stats (
+    granularite TEXT NOT NULL,
+    periode TEXT NOT NULL,
+    secteur TEXT NOT NULL,
+    dimension TEXT NOT NULL,
+    valeur TEXT NOT NULL,
+    nombre INTEGER NOT NULL,
+    PRIMARY KEY (granularite, dimension, periode, secteur, valeur)
+);
+"""
+GRANULARITES = {"jour": 10, "mois": 7}  # longueur du préfixe de la date ISO
+
+SCHEMA_FTS = """
+CREATE VIRTUAL TABLE articles_fts USING fts5(
+    title, summary, uid UNINDEXED,
+    tokenize = 'unicode61 remove_diacritics 2'
+);
+"""
+POIDS_BM25 = (3.0, 1.0)  # un mot du titre compte trois fois plus qu'un mot du résumé
+
+# Colonnes ajoutées après coup : les bases existantes sont migrées à l'ouverture
+COLONNES_DOUBLONS = {"signature": "BLOB", "canonique": "TEXT"}
+
+_ARXIV_VERSION = re.compile(r"v\d+$")
+_IL_Y_A = re.compile(r"(\d+)\s+(minute|hour|day|week|month)s?\s+ago", re.IGNORECASE)
+_UNITES = {"minute": timedelta(minutes=1), "hour": timedelta(hours=1), "day": timedelta(days=1),
+           "week": timedelta(weeks=1), "month": timedelta(days=30)}
+
+
+# 📘 Article Arxiv → enregistrement normalisé (id sans suffixe de version : v1, v2… = même article)
+def normaliser_arxiv(article):
+    identifiant = article.get("id") or article["link"]
+    identifiant = _ARXIV_VERSION.sub("", identifiant.rsplit("/abs/", 1)[-1])
+    return {
+        "uid": f"arxiv:{identifiant}",
+        "source": "arxiv",
+        "title": " ".join(article["title"].split()),
+        "summary": " ".join(article.get("summary", "").split()),
+        "link": article["link"],
+        "published": article["published"],
+    }
+
+
+# 🗞️ Actualité SerpAPI → enregistrement normalisé (SerpAPI donne des dates relatives : « 3 hours ago »)
+def normaliser_news(item, maintenant=None):
+    maintenant = maintenant or datetime.utcnow()
+    correspondance = _IL_Y_A.search(item.get("date", ""))
+    if correspondance:
+        publie = maintenant - int(correspondance.group(1)) * _UNITES[correspondance.group(2).lower()]
+    else:
+        publie = maintenant
+    return {
+        "uid": f"news:{item['link']}",
+        "source": "news",
+        "title": item["title"],
+        "summary": item.get("snippet", ""),
+        "link": item["link"],
+        "published": publie.strftime(FORMAT_DATE),
+    }
+
+
+class ArticleStore:
+    def __init__(self, chemin=CHEMIN):
+        self.chemin = chemin
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(chemin) or ".", exist_ok=True)
+        connexion = self._connexion()
+        connexion.execute("PRAGMA journal_mode=WAL")
+        connexion.executescript(SCHEMA)
+        if not connexion.execute("SELECT 1 FROM sqlite_master WHERE name = 'articles_fts'").fetchone():
+            with connexion:
+                connexion.executescript(SCHEMA_FTS)
+                # Base antérieure à l'index : on indexe l'existant en une passe
+                connexion.execute("INSERT INTO articles_fts (title, summary, uid) SELECT title, summary, uid FROM articles")
+        stats_a_construire = not connexion.execute("SELECT 1 FROM sqlite_master WHERE name = 'stats'").fetchone()
+        colonnes = {ligne[1] for ligne in connexion.execute("PRAGMA table_info(articles)")}
+        with connexion:
+            for colonne, type_sql in COLONNES_DOUBLONS.items():
+                if colonne not in colonnes:
+                    connexion.execute(f"ALTER TABLE articles ADD COLUMN {colonne} {type_sql}")
+            connexion.execute("CREATE INDEX IF NOT EXISTS idx_articles_canonique ON articles(canonique)")
+            if not stats_a_construire:  # agrégats antérieurs à l'exclusion de SANS_MOT_CLE des mots-clés
+                connexion.execute("DELETE FROM stats WHERE dimension = 'keyword' AND valeur = ?", (SANS_MOT_CLE,))
+        self.indexer_doublons()
+        if stats_a_construire:
+            self._construire_statistiques()
+
+    # Une connexion par thread : WAL autorise les lectures concurrentes pendant une écriture
+    def _connexion(self):
+        connexion = getattr(self._local, "connexion", None)
+        if connexion is None:
+            connexion = sqlite3.connect(self.chemin, timeout=30)
+            connexion.execute("PRAGMA synchronous=NORMAL")
+            self._local.connexion = connexion
+        return connexion
+
+    # ➕ Insère les enregistrements (doublons ignorés) et renvoie le nombre d'articles nouvellement
+    # rattachés à ce secteur × mot-clé (un article déjà stocké via un autre mot-clé compte aussi)
+    def ingerer(self, secteur, keyword, enregistrements):
+        collecte_le = datetime.utcnow().strftime(FORMAT_DATE)
+        connexion = self._connexion()
+        with connexion:
+            avant = connexion.total_changes
+            connexion.executemany(
+                "INSERT OR IGNORE INTO articles (uid, source, title, summary, link, published, collecte_le) "
+                "VALUES (:uid, :source, :title, :summary, :link, :published, :collecte_le)",
+                [dict(e, collecte_le=collecte_le) for e in enregistrements]
+            )
+            nouveaux = connexion.total_changes - avant
+            if nouveaux:
+                self._rattacher(connexion, [e["uid"] for e in enregistrements])
+            liens, comptes = 0, 0
+            for e in enregistrements:
+                if connexion.execute(
+                    "INSERT OR IGNORE INTO article_mots_cles (uid, secteur, keyword) VALUES (?, ?, ?)",
+                    (e["uid"], secteur, keyword)
+                ).rowcount:
+                    liens += 1
+                    comptes += self._cumuler(connexion, e["uid"], secteur, keyword)
+            if comptes:
+                self._incrementer(connexion, "version_statistiques")
+            if nouveaux or liens:
+                self._incrementer(connexion, "version_donnees")
+        return liens
+
+    # 📊 Agrégats d'un nouveau lien article × secteur × mot-clé (quasi-doublons exclus : une
+    # histoire reprise par trois sources ne compte qu'une fois) ; renvoie 1 si compté
+    def _cumuler(self, connexion, uid, secteur, keyword):
+        ligne = connexion.execute(
+            "SELECT source, published, title, summary, COALESCE(canonique, uid) FROM articles WHERE uid = ?", (uid,)
+        ).fetchone()
+        if ligne is None or ligne[4] != uid or keyword == MOT_CLE_RECHERCHE:
+            return 0
+        source, published, title, summary, _ = ligne
+        premier_du_secteur = connexion.execute(
+            "SELECT COUNT(*) FROM article_mots_cles WHERE uid = ? AND secteur = ? AND keyword != ?",
+            (uid, secteur, MOT_CLE_RECHERCHE)
+        ).fetchone()[0] == 1
+        increments = [] if keyword == SANS_MOT_CLE else [("keyword", keyword)]
+        if premier_du_secteur:
+            increments += [("source", source), ("type", classifieur_types.type_principal(f"{title} {summary}"))]
+        if not increments:
+            return 0
+        connexion.executemany(
+            "INSERT INTO stats (granularite, periode, secteur, dimension, valeur, nombre) VALUES (?, ?, ?, ?, ?, 1) "
+            "ON CONFLICT (granularite, dimension, periode, secteur, valeur) DO UPDATE SET nombre = nombre + 1",
+            [
+                (granularite, published[:longueur], secteur, dimension, valeur)
+                for granularite, longueur in GRANULARITES.items()
+                for dimension, valeur in increments
+            ]
+        )
+        return 1
+
+    def _incrementer(self, connexion, nom):
+        connexion.execute(
+            "INSERT INTO compteurs (nom, valeur) VALUES (?, 1) ON CONFLICT (nom) DO UPDATE SET valeur = valeur + 1", (nom,)
+        )
+
+    # Base antérieure aux agrégats : on rejoue tous les liens existants une fois
+    def _construire_statistiques(self):
+        connexion = self._connexion()
+        with connexion:
+            # Une seule transaction : une reconstruction interrompue est reprise à l'ouverture suivante
+            connexion.execute("BEGIN")
+            connexion.execute(SCHEMA_STATS)
+            liens = connexion.execute("SELECT uid, secteur, keyword FROM article_mots_cles ORDER BY rowid").fetchall()
+            connexion.execute("DELETE FROM article_mots_cles")
+            for uid, secteur, keyword in liens:
+                connexion.execute("INSERT INTO article_mots_cles (uid, secteur, keyword) VALUES (?, ?, ?)", (uid, secteur, keyword))
+                self._cumuler(connexion, uid, secteur, keyword)
+            self._incrementer(connexion, "version_statistiques")
+
+    # Change à chaque ingestion qui modifie les agrégats : sert de clé au cache des graphiques
+    def version_statistiques(self):
+        ligne = self._connexion().execute("SELECT valeur FROM compteurs WHERE nom = 'version_statistiques'").fetchone()
+        return ligne[0] if ligne else 0
+
+    # Change à chaque ingestion qui ajoute ou rattache un article, recherche libre comprise
+    # (celle-ci ne touche pas aux agrégats) : sert de clé au cache des rapports
+    def version_donnees(self):
+        ligne = self._connexion().execute("SELECT valeur FROM compteurs WHERE nom = 'version_donnees'").fetchone()
+        return ligne[0] if ligne else 0
+
+    # [(periode, secteur, valeur, nombre)] triés par période
+    def statistiques(self, dimension, granularite="mois", secteur=None, depuis=None):
+        sql = "SELECT periode, secteur, valeur, nombre FROM stats WHERE granularite = ? AND dimension = ?"
+        parametres = [granularite, dimension]
+        if secteur:
+            sql += " AND secteur = ?"
+            parametres.append(secteur)
+        if depuis:
+            sql += " AND periode >= ?"
+            parametres.append(depuis)
+        return self._connexion().execute(sql + " ORDER BY periode, secteur, valeur", parametres).fetchall()
+
+    # 🧬 Signature MinHash + index LSH des articles qui n'en ont pas encore, puis rattachement
+    # au canonique le plus proche (ou à eux-mêmes) et indexation plein texte ; les articles
+    # déjà indexés sont ignorés
+    def _rattacher(self, connexion, uids, indexer_texte=True):
+        for uid in uids:
+            ligne = connexion.execute(
+                "SELECT title, summary FROM articles WHERE uid = ? AND signature IS NULL", (uid,)
+            ).fetchone()
+            if ligne is None:
+                continue
+            signature = doublons.signature(*ligne)
+            bandes = doublons.bandes(signature)
+            candidats = connexion.execute(
+                "SELECT DISTINCT a.signature, COALESCE(a.canonique, a.uid) FROM article_bandes b "
+                "JOIN articles a ON a.uid = b.uid WHERE "
+                + " OR ".join("(b.bande = ? AND b.valeur = ?)" for _ in bandes),
+                [v for bande in bandes for v in bande]
+            ).fetchall()
+            proches = [
+                (doublons.similarite(signature, doublons.depuis_blob(blob)), canonique)
+                for blob, canonique in candidats
+            ]
+            proches = [p for p in proches if p[0] >= doublons.SEUIL_JACCARD]
+            canonique = max(proches)[1] if proches else uid
+            connexion.execute(
+                "UPDATE articles SET signature = ?, canonique = ? WHERE uid = ?",
+                (doublons.vers_blob(signature), canonique, uid)
+            )
+            connexion.executemany(
+                "INSERT OR IGNORE INTO article_bandes (bande, valeur, uid) VALUES (?, ?, ?)",
+                [(bande, valeur, uid) for bande, valeur in bandes]
+            )
+            if indexer_texte:
+                connexion.execute("INSERT INTO articles_fts (title, summary, uid) VALUES (?, ?, ?)", (*ligne, uid))
+
+    # Rattrapage des articles stockés avant la détection des doublons, par ordre de collecte
+    def indexer_doublons(self):
+        connexion = self._connexion()
+        uids = [ligne[0] for ligne in connexion.execute(
+            "SELECT uid FROM articles WHERE signature IS NULL ORDER BY collecte_le, published"
+        )]
+        if uids:
+            with connexion:
+                # Déjà présents dans l'index plein texte (rempli à sa création)
+                self._rattacher(connexion, uids, indexer_texte=False)
+        return len(uids)
+
+    def dernier_horodatage(self, keyword, source):
+        ligne = self._connexion().execute(
+            "SELECT MAX(a.published) FROM article_mots_cles m JOIN articles a ON a.uid = m.uid "
+            "WHERE m.keyword = ? AND a.source = ?",
+            (keyword, source)
+        ).fetchone()
+        return datetime.strptime(ligne[0], FORMAT_DATE) if ligne and ligne[0] else None
+
+    # Un article canonique par groupe de quasi-doublons, daté de son membre le plus récent,
+    # avec le nombre d'occurrences par source
+    def derniers_articles(self, secteur, limite=10):
+        lignes = self._connexion().execute(
+            "WITH membres AS ("
+            "  SELECT a.uid, a.source, a.published, COALESCE(a.canonique, a.uid) AS canonique, MIN(m.keyword) AS keyword"
+            "  FROM article_mots_cles m JOIN articles a ON a.uid = m.uid"
+            "  WHERE m.secteur = ? AND m.keyword != ? GROUP BY a.uid"
+            ") "
+            "SELECT c.uid, c.source, c.title, c.summary, c.link, MAX(mb.published) AS recent, MIN(mb.keyword), "
+            "SUM(mb.source = 'arxiv'), SUM(mb.source = 'news') "
+            "FROM membres mb JOIN articles c ON c.uid = mb.canonique "
+            "GROUP BY c.uid ORDER BY recent DESC LIMIT ?",
+            (secteur, MOT_CLE_RECHERCHE, limite)
+        ).fetchall()
+        colonnes = ("uid", "source", "title", "summary", "link", "published", "keyword")
+        return [
+            dict(zip(colonnes, ligne[:7]), sources={s: n for s, n in (("arxiv", ligne[7]), ("news", ligne[8])) if n})
+            for ligne in lignes
+        ]
+
+    # Articles insérés après `rowid` (ordre d'insertion) : synchronisation des index en mémoire
+    def articles_depuis(self, rowid, limite=5000):
+        return self._connexion().execute(
+            "SELECT rowid, uid, title, summary FROM articles WHERE rowid > ? ORDER BY rowid LIMIT ?",
+            (rowid, limite)
+        ).fetchall()
+
+    # 🔍 Recherche plein texte classée par BM25 (meilleur score d'abord, un article par groupe de
+    # quasi-doublons). `requete` : mots libres, `mot*` pour un préfixe (le dernier mot est toujours
+    # traité comme préfixe : saisie en cours) ; `termes` : liste de groupes d'alternatives qui
+    # doivent tous être présents (pays, entreprise…) ; `depuis` : date ISO minimale.
+    def rechercher(self, requete, secteur=None, termes=(), depuis=None, limite=20):
+        expression = _expression_fts(requete, termes)
+        if not expression:
+            return []
+        sql = (
+            "SELECT a.uid, a.source, a.title, a.summary, a.link, a.published, COALESCE(a.canonique, a.uid), "
+            f"bm25(articles_fts, {POIDS_BM25[0]}, {POIDS_BM25[1]}) AS score "
+            "FROM articles_fts JOIN articles a ON a.uid = articles_fts.uid WHERE articles_fts MATCH ?"
+        )
+        parametres = [expression]
+        if secteur:
+            sql += " AND a.uid IN (SELECT uid FROM article_mots_cles WHERE secteur = ?)"
+            parametres.append(secteur)
+        if depuis:
+            sql += " AND a.published >= ?"
+            parametres.append(depuis)
+        sql += " ORDER BY score LIMIT ?"
+        parametres.append(4 * limite)  # marge pour les quasi-doublons écartés ci-dessous
+
+        resultats, canoniques = [], set()
+        for ligne in self._connexion().execute(sql, parametres):
+            if ligne[6] in canoniques:
+                continue
+            canoniques.add(ligne[6])
+            resultats.append(dict(zip(("uid", "source", "title", "summary", "link", "published"), ligne[:6]), score=-ligne[7]))
+            if len(resultats) == limite:
+                break
+        return resultats
+
+
+def _phrase_fts(texte):
+    return '"' + texte.replace('"', '""') + '"'
+
+
+def _expression_fts(requete, termes=()):
+    mots = re.findall(r"\w+\*?", requete)
+    clauses = []
+    if mots:
+        clauses.append(" ".join(
+            _phrase_fts(mot.rstrip("*")) + ("*" if mot.endswith("*") or i == len(mots) - 1 else "")
+            for i, mot in enumerate(mots)
+        ))
+    for alternatives in termes:
+        clauses.append("(" + " OR ".join(_phrase_fts(a) for a in alternatives) + ")")
+    return " AND ".join(clauses)
+
+
+_store = None
+_verrou = threading.Lock()
+
+
+def store_partage():
+    global _store
+    with _verrou:
+        if _store is None:
+            _store = ArticleStore()
+        return _store
@@ -0,0 +1,60 @@
+import sys
+from collections import deque
+
+# 🧾 Tendances compactes.
+# Une tendance est un petit enregistrement à __slots__ (aucun __dict__ par instance) ; source,
+# secteur et mot-clé sont internés, toutes les tendances partagent donc les mêmes chaînes.
+# Chaque secteur garde un tampon circulaire de taille fixe, dédoublonné à l'insertion par uid.
+# Les sessions ne lisent que le snapshot partagé : la mémoire ne grandit pas avec leur âge.
+
+ICONES = {"arxiv": "📘", "news": "🗞️"}
+
+
+class Tendance:
+    __slots__ = ("uid", "source", "secteur", "keyword", "titre", "lien", "publie", "sources")
+
+    def __init__(self, uid, source, secteur, keyword, titre, lien, publie, sources=()):
+        self.uid = uid
+        self.source = sys.intern(source)
+        self.secteur = sys.intern(secteur)
+        self.keyword = sys.intern(keyword)
+        self.titre = titre
+        self.lien = lien
+        self.publie = publie
+        # Occurrences par source des quasi-doublons regroupés sous cette tendance
+        self.sources = tuple((sys.intern(s), n) for s, n in sources)
+
+    @classmethod
+    def depuis_article(cls, secteur, article):
+        return cls(article["uid"], article["source"], secteur, article.get("keyword") or "",
+                   article["title"], article["link"], article["published"],
+                   sorted(article.get("sources", {}).items()))
+
+    def __str__(self):
+        ligne = f"{ICONES.get(self.source, '•')} {self.titre}"
+        if sum(n for _, n in self.sources) > 1:
+            ligne += " (" + " · ".join(f"{n} {ICONES.get(s, s)}" for s, n in self.sources) + ")"
+        return ligne
+
+
+class FilTendances:
+    def __init__(self, capacite):
+        self._elements = deque(maxlen=capacite)
+        self._uids = set()
+
+    # ➕ Ajoute en fin de tampon (le plus ancien est évincé) ; renvoie False pour un doublon
+    def ajouter(self, tendance):
+        if tendance.uid in self._uids:
+            return False
+        if len(self._elements) == self._elements.maxlen:
+            self._uids.discard(self._elements[0].uid)
+        self._elements.append(tendance)
+        self._uids.add(tendance.uid)
+        return True
+
+    def __len__(self):
+        return len(self._elements)
+
+    # Vue immuable pour le snapshot, la plus récente d'abord
+    def figer(self):
+        return tuple(sorted(self._elements, key=lambda t: t.publie, reverse=True))
@@ -0,0 +1,57 @@
+import math
+from collections import Counter
+
+import numpy as np
+import pytest
+
+from pertinence import IndexTfIdf, profil, tokeniser
+
+
+# Cosinus TF-IDF calculé terme à terme, sans matrice creuse : référence du score vectorisé
+def cosinus_naif(documents, termes_profil):
+    comptes = [Counter(tokeniser(texte)) for _, texte in documents]
+    df = Counter(terme for compte in comptes for terme in compte)
+    idf = {terme: math.log((1 + len(documents)) / (1 + n)) + 1.0 for terme, n in df.items()}
+    requete = {terme: poids * idf[terme] for terme, poids in termes_profil.items() if terme in idf}
+    norme_requete = math.sqrt(sum(v * v for v in requete.values())) or 1.0
+    scores = []
+    for compte in comptes:
+        vecteur = {terme: (1.0 + math.log(n)) * idf[terme] for terme, n in compte.items()}
+        norme = math.sqrt(sum(v * v for v in vecteur.values()))
+        produit = sum(v * requete.get(terme, 0.0) for terme, v in vecteur.items())
+        scores.append(produit / norme_requete / norme if norme else 0.0)
+    return scores
+
+
+@pytest.mark.parametrize("documents", [
+    [("a", "agents autonomous"), ("b", "the of")],
+    [("a", "the"), ("b", "autonomous agents for patient care"), ("c", "of and"), ("d", "clinical agents agents")],
+    [("a", "the of"), ("b", "and")],
+    [("a", "healthcare diagnosis agents"), ("b", "banking fraud detection"), ("c", "hospital patient agents hospital")],
+])
+def test_scorer_egal_au_cosinus_naif(documents):
+    index = IndexTfIdf()
+    index.ajouter(documents)
+    profils = [profil("Santé", ["autonomous agents"]), Counter({"agent": 1.0}), Counter({"fraud": 2.0, "bank": 1.0})]
+    scores = index.scorer(profils)
+    lignes = index.lignes([uid for uid, _ in documents])
+    for colonne, termes in enumerate(profils):
+        attendus = cosinus_naif(documents, termes)
+        assert np.allclose(scores[lignes, colonne], attendus)
+
+
+def test_scorer_document_identique_au_profil():
+    index = IndexTfIdf()
+    index.ajouter([("a", "agents autonomous"), ("b", "the of")])
+    scores = index.scorer([Counter({"agent": 1.0, "autonomou": 1.0})])[:, 0]
+    assert scores[index.lignes(["a"])[0]] == pytest.approx(1.0)
+    assert scores[index.lignes(["b"])[0]] == 0.0
+
+
+def test_scorer_par_lots():
+    index = IndexTfIdf()
+    index.ajouter([("a", "clinical agents")])
+    index.ajouter([("b", "the of"), ("c", "agents for fraud")])
+    documents = [("a", "clinical agents"), ("b", "the of"), ("c", "agents for fraud")]
+    scores = index.scorer([Counter({"agent": 1.0})])[:, 0]
+    assert np.allclose(scores[index.lignes(["a", "b", "c"])], cosinus_naif(documents, {"agent": 1.0}))
@@ -1,32 +1,169 @@
 import streamlit as st
-from datetime import datetime
-import plotly.express as px
-from notion_client import Client
+from datetime import datetime, timedelta
+import os
 import urllib.parse
-import feedparser
-import pandas as pd
-import plotly.express as px
+import re
+import time
+import http_client
+import notion_queue
+from arxiv_stream import ErreurArxiv, ResultatEnErreur, lire_flux_arxiv
+from cache import en_cache
+from metrics import compter_octets, mesurer
+from quota import ErreurSerpAPI, autoriser_nouvelle_tentative, protege_serpapi
+from store import MOT_CLE_RECHERCHE, normaliser_arxiv, normaliser_news, store_partage
+
+DELAI_PAGES_ARXIV = 3  # secondes entre deux pages, comme le demande l'API Arxiv
+
+# 🎛️ Valeurs des filtres (barre latérale et génération en lot)
+SECTEURS = ["Santé", "Finance"]
+PAYS = ["Tous", "Canada", "États-Unis", "France", "Allemagne"]
+ENTREPRISES = ["Toutes", "Pfizer", "JP Morgan", "Mayo Clinic", "OpenAI", "Amazon"]
+
+# Points d'accès surchargeables : le serveur de rejeu (replay.py) se substitue aux vraies API
+ARXIV_URL = os.getenv("AGENTWATCH_ARXIV_URL", "http://export.arxiv.org/api/query?")
+SERPAPI_URL = os.getenv("AGENTWATCH_SERPAPI_URL", "https://serpapi.com/search")
 
 # 🔍 Requête Arxiv
-def search_arxiv(query="autonomous AI agents", max_results=5, days=7):
-    base_url = "http://export.arxiv.org/api/query?"
+@en_cache("arxiv")
+@mesurer("search_arxiv", source="arxiv")
+def search_arxiv(query="autonomous AI agents", max_results=5, days=7, depuis=None):
+    base_url = ARXIV_URL
     encoded_query = urllib.parse.quote(query)
     url = f"{base_url}search_query=all:{encoded_query}&start=0&max_results={max_results}&sortBy=lastUpdatedDate&sortOrder=descending"
 
-    feed = feedparser.parse(url)
-    cutoff = datetime.now() - pd.Timedelta(days=days)
-    results = []
-
-    for entry in feed.entries:
-        published = datetime.strptime(entry.published, "%Y-%m-%dT%H:%M:%SZ")
-        if published >= cutoff:
-            results.append({
-                "title": entry.title,
-                "summary": entry.summary,
-                "link": entry.link,
-                "published": entry.published
-            })
-    return results
+    # Collecte incrémentale : `depuis` (dernier article connu) remplace la fenêtre de `days` jours
+    cutoff = depuis or datetime.now() - timedelta(days=days)
+    try:
+        return list(lire_flux_arxiv(url, cutoff, inclure_cutoff=not depuis))
+    except ErreurArxiv:  # affichage : une erreur vaut un résultat vide, re-tenté après TTL_VIDE
+        return ResultatEnErreur()
+
+# 📚 Requête Arxiv groupée : les mots-clés d'un secteur en un seul search_query (OR), paginé,
+# puis chaque article est rattaché au(x) mot(s)-clé(s) qu'il contient ; une page en erreur lève
+# ErreurArxiv (le planificateur de collecte la compte comme un échec)
+@en_cache("arxiv")
+@mesurer("search_arxiv_lot", source="arxiv")
+def search_arxiv_lot(keywords, max_results=50, days=7, depuis=None, par_page=50):
+    base_url = ARXIV_URL
+    encoded_query = urllib.parse.quote(" OR ".join(f'all:"{kw}"' for kw in keywords), safe=":")
+    # `depuis` : dict mot-clé → dernier article connu ; la requête couvre le plus ancien
+    depuis = depuis or {}
+    fenetre = datetime.now() - timedelta(days=days)
+    limites = {kw: depuis.get(kw) or fenetre for kw in keywords}
+    cutoff = min(limites.values())
+
+    resultats = {kw: [] for kw in keywords}
+    resultats[None] = []  # articles qu'aucun mot-clé ne retrouve littéralement (racinisation Arxiv)
+    for start in range(0, max_results, par_page):
+        if start:
+            time.sleep(DELAI_PAGES_ARXIV)
+        taille = min(par_page, max_results - start)
+        url = f"{base_url}search_query={encoded_query}&start={start}&max_results={taille}&sortBy=lastUpdatedDate&sortOrder=descending"
+        bilan = {}
+        for article in lire_flux_arxiv(url, cutoff, bilan=bilan):
+            published = datetime.strptime(article["published"], "%Y-%m-%dT%H:%M:%SZ")
+            mots = _mots(f"{article['title']} {article['summary']}")
+            trouves = [kw for kw in keywords if _mots(kw) <= mots]
+            for kw in trouves or [None]:
+                limite = limites.get(kw, cutoff)
+                if published > limite if depuis.get(kw) else published >= limite:
+                    resultats[kw].append(article)
+        if bilan["coupe"] or bilan["entrees"] < taille:
+            break
+    return resultats
+
+def _mots(texte):
+    return {mot.rstrip("s") for mot in re.findall(r"\w+", texte.lower())}
+
+# 🗞️ Requête Google News (SerpAPI)
+@en_cache("news")
+@protege_serpapi
+@mesurer("get_google_news", source="news")
+def get_google_news(query, api_key, max_results=5, depuis=None):
+    url = SERPAPI_URL
+    params = {
+        "engine": "google",
+        "q": query,
+        "tbm": "nws",
+        "api_key": api_key,
+        "num": max_results
+    }
+    if depuis:
+        # Collecte incrémentale : plus petite fenêtre Google (heure, jour, semaine, mois) couvrant `depuis`
+        age = datetime.utcnow() - depuis
+        for limite, periode in ((timedelta(hours=1), "h"), (timedelta(days=1), "d"), (timedelta(weeks=1), "w"), (timedelta(days=31), "m")):
+            if age <= limite:
+                params["tbs"] = f"qdr:{periode}"
+                break
+    response = http_client.get(url, params=params, nouvelle_tentative=autoriser_nouvelle_tentative)
+    if response.status_code != 200:
+        raise ErreurSerpAPI(f"SerpAPI a répondu {response.status_code}")
+    compter_octets("news", len(response.content))
+    return response.json().get("news_results", [])
+
+# 🏷️ Mots-clés suivis par secteur
+def mots_cles():
+    return {
+        "Santé": [
+            "healthcare AI",
+            "medical agents",
+            "AI diagnosis",
+            "AI patient care"
+        ],
+        "Finance": [
+            "AI investment",
+            "AI in banking",
+            "fraud detection AI",
+            "autonomous financial agents"
+        ]
+    }
+
+# 🔍 Recherche libre : d'abord l'index plein texte local (quelques millisecondes, sans quota),
+# les API seulement si la base ne couvre pas la requête — leurs réponses sont alors ingérées
+# et la même recherche sera servie localement la fois suivante
+TERMES_PAYS = {
+    "Canada": ["Canada", "Canadian"],
+    "États-Unis": ["United States", "USA", "US", "American"],
+    "France": ["France", "French"],
+    "Allemagne": ["Germany", "German"],
+}
+
+@mesurer("recherche_libre")
+def recherche_libre(requete, secteur, pays, entreprise, api_key, max_articles=5, max_news=5, local_seulement=False):
+    termes = []
+    if pays in TERMES_PAYS:
+        termes.append(TERMES_PAYS[pays])
+    if entreprise != "Toutes":
+        termes.append([entreprise, entreprise.replace(" ", "")])
+
+    store = store_partage()
+    trouves = store.rechercher(requete, secteur=secteur, termes=termes, limite=max_articles + max_news)
+    if trouves:
+        articles = [
+            {"title": a["title"], "link": a["link"], "published": a["published"], "summary": a["summary"]}
+            for a in trouves if a["source"] == "arxiv"
+        ][:max_articles]
+        news = [
+            {"title": a["title"], "link": a["link"], "snippet": a["summary"]}
+            for a in trouves if a["source"] == "news"
+        ][:max_news]
+        return articles, news, "local"
+    if local_seulement:  # pré-calculs en arrière-plan : jamais d'appel aux API
+        return [], [], "local"
+
+    cible = entreprise if entreprise != "Toutes" else ""
+    articles = search_arxiv(query=f"{requete} {cible} {secteur}".strip(), max_results=max_articles)
+    # « partiel » : une API en échec (ou servie périmée), le résultat ne doit pas être tenu pour complet
+    echec = getattr(articles, "en_erreur", False)
+    try:
+        news = get_google_news(f"{cible} {requete}".strip(), api_key, max_results=max_news)
+        echec = echec or getattr(news, "perime", False)
+    except ErreurSerpAPI:  # API indisponible et aucun résultat connu : la recherche reste utilisable
+        news = []
+        echec = True
+    store.ingerer(secteur, MOT_CLE_RECHERCHE, [normaliser_arxiv(a) for a in articles])
+    store.ingerer(secteur, MOT_CLE_RECHERCHE, [normaliser_news(n) for n in news])
+    return articles, news, "partiel" if echec else "api"
 
 # 📄 Données d’analyse pour le rapport
 def get_insights_data(secteur, pays, entreprise):
@@ -44,7 +181,26 @@ def get_insights_data(secteur, pays, entreprise):
     entreprise_note = f"🔎 Focus sur **{entreprise}**" if entreprise != "Toutes" else ""
     return data.get(secteur, []), pays_note, entreprise_note
 
+# 📤 HTML du rapport exporté en PDF
+def html_rapport(secteur, pays, entreprise, insights, note_pays, note_entreprise, recommandations=()):
+    return f"""
+    <html><head><meta charset='UTF-8'></head><body>
+    <h1>Rapport de veille stratégique IA</h1>
+    <hr>
+    <p><strong>Secteur :</strong> {secteur}</p>
+    <p><strong>Pays :</strong> {pays}</p>
+    <p><strong>Entreprise :</strong> {entreprise}</p>
+    <p><strong>Date :</strong> {datetime.now().strftime('%d %B %Y')}</p>
+    <h2>🧠 Informations clés :</h2>
+    <ul>{''.join(f"<li>{i}</li>" for i in insights)}</ul>
+    <p>{note_pays}</p>
+    <p>{note_entreprise}</p>
+    {"<h2>💡 Recommandations Salesforce :</h2><ul>" + "".join(f"<li>{r}</li>" for r in recommandations) + "</ul>" if recommandations else ""}
+    </body></html>
+    """
+
 # 🗃️ Enregistrement dans Notion
+@mesurer("enregistrer_dans_notion")
 def enregistrer_dans_notion(titre, contenu, secteur, pays, entreprise):
     notion_token = st.secrets.get("NOTION_TOKEN")
     notion_db = st.secrets.get("NOTION_DB_ID")
@@ -53,18 +209,11 @@ def enregistrer_dans_notion(titre, contenu, secteur, pays, entreprise):
         st.warning("⚠️ Clé API ou ID Notion manquant.")
         return
 
-    notion = Client(auth=notion_token)
-    notion.pages.create(
-        parent={"database_id": notion_db},
-        properties={
-            "Nom": {"title": [{"text": {"content": titre}}]},
-            "Secteur": {"rich_text": [{"text": {"content": secteur}}]},
-            "Pays": {"rich_text": [{"text": {"content": pays}}]},
-            "Entreprise": {"rich_text": [{"text": {"content": entreprise}}]},
-            "Date": {"date": {"start": datetime.now().isoformat()}}
-        },
-        children=[{
-            "object": "block", "type": "paragraph",
-            "paragraph": {"text": [{"type": "text", "text": {"content": contenu}}]}
-        }]
-    )
\ No newline at end of file
+    # Mise en file : l'envoi se fait en arrière-plan, un double clic ne crée pas de doublon
+    notion_queue.demarrer(notion_token, notion_db)
+    cle, nouveau = notion_queue.mettre_en_file(titre, contenu, secteur, pays, entreprise)
+    st.session_state["dernier_export_notion"] = cle  # page suivie par la session (et par le test de charge)
+    if nouveau:
+        st.success("🗃 Rapport ajouté à la file d’export Notion")
+    else:
+        st.info("ℹ️ Ce rapport est déjà en file ou enregistré dans Notion.")